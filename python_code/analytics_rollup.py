@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Roll the raw app_analytics and lottery_actions tables up into analytics_rollups.
+
+Every device writes raw rows; dashboards should read the rollups instead: one row per
+day or ISO week and dimension (all activity, action type, platform, app version) with an
+event count and an estimate of distinct active devices. Devices are counted with a
+HyperLogLog sketch that is stored, compressed, on the rollup row, so a later run can merge
+new devices into a day that was already rolled up without double counting them.
+
+New rows are pulled by keyset pagination from watermarks kept in analytics_rollup_state:
+lottery_actions is append-only and paged by id; app_analytics keeps one row per device
+that is updated on every open, so it is paged by (updated_at, id). Its open_count is
+cumulative, so the open_count each device had at the previous run is kept in
+analytics_rollup_devices and only the difference is counted, on the device's last_open day.
+
+    python analytics_rollup.py
+    python analytics_rollup.py --page-size 5000
+"""
+
+import argparse
+import base64
+import hashlib
+import math
+import sys
+import zlib
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Tuple
+
+from migrate_to_supabase import SupabaseMigrator, load_env
+
+# 2^11 registers: about 2.3% standard error on distinct device counts
+HLL_PRECISION = 11
+
+# Rows committed in the last few minutes may still be joined by concurrent transactions with
+# lower ids / earlier updated_at; leave them for the next run so the watermark never skips one
+SETTLE_DELAY = timedelta(minutes=2)
+
+# Upsert the rollups and advance the watermarks after this many pages
+FLUSH_PAGES = 50
+
+RollupKey = Tuple[str, str, str, str]  # (period, period_start, dimension, value)
+
+
+class HyperLogLog:
+    """Distinct-count sketch over 64-bit blake2b hashes"""
+
+    def __init__(self, precision: int = HLL_PRECISION, registers: bytes = None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    def add(self, item: str):
+        x = int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'big')
+        index = x >> (64 - self.precision)
+        rest = x & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: 'HyperLogLog'):
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def estimate(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * self.m and zeros:
+            # Linear counting is more accurate while most registers are still empty
+            return round(self.m * math.log(self.m / zeros))
+        return round(raw)
+
+    def to_text(self) -> str:
+        return base64.b64encode(zlib.compress(bytes(self.registers), 9)).decode('ascii')
+
+    @classmethod
+    def from_text(cls, text: str) -> 'HyperLogLog':
+        registers = zlib.decompress(base64.b64decode(text))
+        return cls(int(math.log2(len(registers))), registers)
+
+
+class Rollups:
+    """Event counts and device sketches per rollup key, accumulated in memory between flushes"""
+
+    def __init__(self):
+        self.entries: Dict[RollupKey, List] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, day: date, device_id: str, dimensions: List[Tuple[str, str]], events: int = 1):
+        week = day - timedelta(days=day.weekday())
+        for period, start in (('day', day), ('week', week)):
+            for dimension, value in [('all', '')] + dimensions:
+                entry = self.entries.get((period, start.isoformat(), dimension, value))
+                if entry is None:
+                    entry = self.entries[(period, start.isoformat(), dimension, value)] = [0, HyperLogLog()]
+                entry[0] += events
+                entry[1].add(device_id)
+
+    def merged_rows(self, existing: Dict[RollupKey, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Rollup rows with the stored counts and sketches of the same keys folded in"""
+        rows = []
+        now = datetime.now(timezone.utc).isoformat()
+        for key, (events, sketch) in self.entries.items():
+            stored = existing.get(key)
+            if stored:
+                events += stored['events']
+                sketch.merge(HyperLogLog.from_text(stored['devices_hll']))
+            period, period_start, dimension, value = key
+            rows.append({
+                'period': period,
+                'period_start': period_start,
+                'dimension': dimension,
+                'value': value,
+                'events': events,
+                'active_devices': sketch.estimate(),
+                'devices_hll': sketch.to_text(),
+                'updated_at': now,
+            })
+        return rows
+
+
+def _day(timestamp: str) -> date:
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00')).astimezone(timezone.utc).date()
+
+
+class AnalyticsRollupJob(SupabaseMigrator):
+    def read_state(self) -> Dict[str, Dict[str, Any]]:
+        response = self._request(
+            'GET', f"{self.supabase_url}/rest/v1/analytics_rollup_state?select=source,last_id,last_updated_at",
+            headers=self.headers
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Could not read analytics_rollup_state: {response.status_code} {response.text}")
+        return {row['source']: row for row in response.json()}
+
+    def save_state(self, state: Dict[str, Dict[str, Any]]):
+        headers = dict(self.headers)
+        headers['Prefer'] = 'resolution=merge-duplicates,return=minimal'
+        response = self._request(
+            'POST', f"{self.supabase_url}/rest/v1/analytics_rollup_state?on_conflict=source",
+            headers=headers,
+            json=list(state.values())
+        )
+        if response.status_code not in (200, 201):
+            raise RuntimeError(f"Could not save analytics_rollup_state: {response.status_code} {response.text}")
+
+    def _get_page(self, table: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        response = self._request('GET', f"{self.supabase_url}/rest/v1/{table}", headers=self.headers, params=params)
+        if response.status_code != 200:
+            raise RuntimeError(f"Reading {table} failed: {response.status_code} {response.text}")
+        return response.json()
+
+    def action_pages(self, last_id: int, cutoff: str, page_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """lottery_actions after `last_id`, oldest first"""
+        while True:
+            page = self._get_page('lottery_actions', {
+                'select': 'id,device_id,action_type,timestamp',
+                'id': f'gt.{last_id}',
+                'created_at': f'lt.{cutoff}',
+                'order': 'id.asc',
+                'limit': page_size,
+            })
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            last_id = page[-1]['id']
+
+    def open_pages(self, last_updated_at: str | None, last_id: int, cutoff: str,
+                   page_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """app_analytics rows updated after (`last_updated_at`, `last_id`), oldest update first"""
+        while True:
+            params = {
+                'select': 'id,device_id,app_version,platform,open_count,last_open,updated_at',
+                'order': 'updated_at.asc,id.asc',
+                'limit': page_size,
+            }
+            if last_updated_at:
+                # Timestamps contain reserved characters, so they are quoted inside the logic tree
+                params['or'] = f'(updated_at.gt."{last_updated_at}",and(updated_at.eq."{last_updated_at}",id.gt.{last_id}))'
+            params['updated_at'] = f'lt.{cutoff}'
+            page = self._get_page('app_analytics', params)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            last_updated_at, last_id = page[-1]['updated_at'], page[-1]['id']
+
+    def device_opens(self, device_ids: List[str]) -> Dict[str, int]:
+        """open_count of each device as of the previous run; devices never rolled up are missing"""
+        counts = {}
+        for i in range(0, len(device_ids), 100):
+            # Device ids are quoted in case they contain commas or parentheses
+            quoted = ','.join('"{}"'.format(d.replace('"', '\\"')) for d in device_ids[i:i + 100])
+            for row in self._get_page('analytics_rollup_devices', {
+                'select': 'device_id,open_count',
+                'device_id': f'in.({quoted})',
+            }):
+                counts[row['device_id']] = row['open_count']
+        return counts
+
+    def save_device_opens(self, device_opens: Dict[str, int]):
+        headers = dict(self.headers)
+        headers['Prefer'] = 'resolution=merge-duplicates,return=minimal'
+        rows = [{'device_id': device, 'open_count': count} for device, count in device_opens.items()]
+        for i in range(0, len(rows), 500):
+            response = self._request(
+                'POST', f"{self.supabase_url}/rest/v1/analytics_rollup_devices?on_conflict=device_id",
+                headers=headers,
+                json=rows[i:i + 500]
+            )
+            if response.status_code not in (200, 201):
+                raise RuntimeError(f"Saving analytics_rollup_devices failed: {response.status_code} {response.text}")
+
+    def existing_rollups(self, rollups: Rollups) -> Dict[RollupKey, Dict[str, Any]]:
+        """Stored rollup rows for the period starts touched by `rollups`"""
+        starts = sorted({key[1] for key in rollups.entries})
+        existing = {}
+        for i in range(0, len(starts), 100):
+            response = self._request(
+                'GET', f"{self.supabase_url}/rest/v1/analytics_rollups",
+                headers=self.headers,
+                params={
+                    'select': 'period,period_start,dimension,value,events,devices_hll',
+                    'period_start': f"in.({','.join(starts[i:i + 100])})",
+                }
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"Reading analytics_rollups failed: {response.status_code} {response.text}")
+            for row in response.json():
+                existing[(row['period'], row['period_start'], row['dimension'], row['value'])] = row
+        return existing
+
+    def flush(self, rollups: Rollups, state: Dict[str, Dict[str, Any]], device_opens: Dict[str, int]) -> int:
+        """
+        Merge `rollups` into Supabase, then record the devices' open counts and advance the
+        watermarks past the rows they came from
+        """
+        if not len(rollups) and not device_opens:
+            return 0
+        rows = rollups.merged_rows(self.existing_rollups(rollups)) if len(rollups) else []
+        headers = dict(self.headers)
+        headers['Prefer'] = 'resolution=merge-duplicates,return=minimal'
+        for i in range(0, len(rows), 500):
+            response = self._request(
+                'POST', f"{self.supabase_url}/rest/v1/analytics_rollups?on_conflict=period,period_start,dimension,value",
+                headers=headers,
+                json=rows[i:i + 500]
+            )
+            if response.status_code not in (200, 201):
+                raise RuntimeError(f"Upserting analytics_rollups failed: {response.status_code} {response.text}")
+        # A failure between the upsert and these writes replays the batch next run: device counts
+        # are unaffected (sketch merge is idempotent) but its event counts are added twice
+        self.save_device_opens(device_opens)
+        self.save_state(state)
+        return len(rows)
+
+    def run(self, page_size: int = 1000) -> int:
+        """Roll up every row past the watermarks; returns the number of rollup rows written"""
+        state = self.read_state()
+        actions = state.setdefault('lottery_actions', {'source': 'lottery_actions', 'last_id': 0, 'last_updated_at': None})
+        opens = state.setdefault('app_analytics', {'source': 'app_analytics', 'last_id': 0, 'last_updated_at': None})
+        cutoff = (datetime.now(timezone.utc) - SETTLE_DELAY).isoformat()
+
+        rollups = Rollups()
+        # open_count per device read since the last flush, not yet saved to analytics_rollup_devices
+        device_opens: Dict[str, int] = {}
+        written = 0
+        pulled = 0
+        pages = 0
+
+        for page in self.action_pages(actions['last_id'], cutoff, page_size):
+            for row in page:
+                rollups.add(_day(row['timestamp']), row['device_id'], [('action', row['action_type'])])
+            actions['last_id'] = page[-1]['id']
+            pulled += len(page)
+            pages += 1
+            if pages % FLUSH_PAGES == 0:
+                written += self.flush(rollups, state, device_opens)
+                rollups = Rollups()
+
+        for page in self.open_pages(opens['last_updated_at'], opens['last_id'], cutoff, page_size):
+            previous = self.device_opens([row['device_id'] for row in page if row['device_id'] not in device_opens])
+            previous.update(device_opens)
+            for row in page:
+                count = row['open_count'] or 0
+                before = previous.get(row['device_id'], 0)
+                # A lower count means the device's row was recreated, so its count started over
+                new_opens = count - before if count >= before else count
+                device_opens[row['device_id']] = previous[row['device_id']] = count
+                if new_opens > 0:
+                    rollups.add(_day(row['last_open']), row['device_id'],
+                                [('platform', row['platform']), ('app_version', row['app_version'])], new_opens)
+            opens['last_updated_at'], opens['last_id'] = page[-1]['updated_at'], page[-1]['id']
+            pulled += len(page)
+            pages += 1
+            if pages % FLUSH_PAGES == 0:
+                written += self.flush(rollups, state, device_opens)
+                rollups = Rollups()
+                device_opens = {}
+
+        written += self.flush(rollups, state, device_opens)
+        print(f"✅ Rolled up {pulled} new rows into {written} rollup row updates")
+        return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Aggregate app_analytics and lottery_actions into analytics_rollups')
+    parser.add_argument('--page-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    env_vars = load_env()
+    supabase_url = env_vars.get('EXPO_PUBLIC_SUPABASE_URL')
+    supabase_key = env_vars.get('EXPO_PUBLIC_SUPABASE_ANON_KEY')
+    if not supabase_url or not supabase_key:
+        print("❌ Missing required environment variables:")
+        print("   EXPO_PUBLIC_SUPABASE_URL")
+        print("   EXPO_PUBLIC_SUPABASE_ANON_KEY")
+        print("\n💡 Tip: reading the raw tables and writing rollups needs the service_role key")
+        sys.exit(1)
+
+    job = AnalyticsRollupJob(supabase_url, supabase_key)
+    try:
+        job.run(args.page_size)
+    except Exception as e:
+        print(f"❌ Rollup failed: {e}")
+        sys.exit(1)
+    finally:
+        print(f"📡 Request outcomes: {job.counters.summary()}")
+
+
+if __name__ == "__main__":
+    main()
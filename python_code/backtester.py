@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Replay ticket-selection strategies against every historical Cashpot draw and compare them
+with Monte Carlo baselines of randomly picked tickets.
+
+Tickets and draws are stored as uint32 ball bitmasks, so matching a whole history is one
+AND plus a popcount per ticket. Monte Carlo shards run in a ProcessPoolExecutor, each with
+its own seed spawned from a single SeedSequence so results do not depend on worker count.
+"""
+
+import argparse
+import json
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from draw_history import BALLS_PER_DRAW, DEFAULT_DB_PATH, MAX_BALL, DrawHistory
+from frequency_index import FrequencyIndex
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'backtests')
+
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """Number of set bits in each uint32"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values).astype(np.uint8)
+    as_bytes = np.ascontiguousarray(values, dtype=np.uint32).view(np.uint8).reshape(-1, 4)
+    return _POPCOUNT_TABLE[as_bytes].sum(axis=1, dtype=np.uint8).reshape(values.shape)
+
+
+def tickets_to_masks(tickets: np.ndarray) -> np.ndarray:
+    return np.bitwise_or.reduce(np.left_shift(np.uint32(1), tickets.astype(np.uint32)), axis=1)
+
+
+def random_tickets(rng: np.random.Generator, pool_sizes: np.ndarray) -> np.ndarray:
+    """One random ticket of distinct balls per entry of `pool_sizes`, drawn from 1..pool"""
+    tickets = np.empty((len(pool_sizes), BALLS_PER_DRAW), dtype=np.int8)
+    for pool in np.unique(pool_sizes):
+        rows = np.flatnonzero(pool_sizes == pool)
+        keys = rng.random((len(rows), int(pool)), dtype=np.float32)
+        tickets[rows] = np.argpartition(keys, BALLS_PER_DRAW - 1, axis=1)[:, :BALLS_PER_DRAW] + 1
+    return tickets
+
+
+def match_histogram(ticket_masks: np.ndarray, draw_masks: np.ndarray) -> np.ndarray:
+    """How many tickets matched 0..BALLS_PER_DRAW balls of the draw they were played against"""
+    return np.bincount(popcount(ticket_masks & draw_masks), minlength=BALLS_PER_DRAW + 1)[:BALLS_PER_DRAW + 1]
+
+
+class Strategy(ABC):
+    """Picks one ticket per draw using only the draws before it"""
+    name = 'strategy'
+
+    def key(self) -> str:
+        return self.name
+
+    @abstractmethod
+    def tickets(self, history: DrawHistory, index: FrequencyIndex) -> np.ndarray:
+        """One ticket (a row of BALLS_PER_DRAW balls) per draw in `history`"""
+
+
+class HotNumbers(Strategy):
+    name = 'hot'
+
+    def __init__(self, lookback: int = 100):
+        self.lookback = lookback
+
+    def key(self) -> str:
+        return f'{self.name}-{self.lookback}'
+
+    def _ranked(self, history: DrawHistory, index: FrequencyIndex, descending: bool) -> np.ndarray:
+        counts = index.window_counts(self.lookback)[:, 1:].astype(np.int64)
+        out_of_pool = np.arange(1, MAX_BALL + 1)[None, :] > history.pool_sizes()[:, None]
+        counts = -counts if descending else counts
+        counts[out_of_pool] = np.iinfo(np.int64).max
+        return np.argsort(counts, axis=1, kind='stable')[:, :BALLS_PER_DRAW] + 1
+
+    def tickets(self, history: DrawHistory, index: FrequencyIndex) -> np.ndarray:
+        return self._ranked(history, index, descending=True)
+
+
+class ColdNumbers(HotNumbers):
+    name = 'cold'
+
+    def tickets(self, history: DrawHistory, index: FrequencyIndex) -> np.ndarray:
+        return self._ranked(history, index, descending=False)
+
+
+class FixedPicks(Strategy):
+    name = 'fixed'
+
+    def __init__(self, balls: Sequence[int]):
+        if len(set(balls)) != BALLS_PER_DRAW:
+            raise ValueError(f'Fixed picks need {BALLS_PER_DRAW} distinct balls')
+        self.balls = sorted(int(b) for b in balls)
+
+    def key(self) -> str:
+        return f'{self.name}-' + '-'.join(str(b) for b in self.balls)
+
+    def tickets(self, history: DrawHistory, index: FrequencyIndex) -> np.ndarray:
+        return np.tile(np.array(self.balls, dtype=np.int8), (len(history), 1))
+
+
+class RandomPicks(Strategy):
+    name = 'random'
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+
+    def key(self) -> str:
+        return f'{self.name}-{self.seed}'
+
+    def tickets(self, history: DrawHistory, index: FrequencyIndex) -> np.ndarray:
+        return random_tickets(np.random.default_rng(self.seed), history.pool_sizes())
+
+
+# Draw masks and pool sizes shared with Monte Carlo worker processes
+_WORKER_DRAWS = None
+_WORKER_POOLS = None
+
+
+def _init_worker(draw_masks: np.ndarray, pool_sizes: np.ndarray):
+    global _WORKER_DRAWS, _WORKER_POOLS
+    _WORKER_DRAWS = draw_masks
+    _WORKER_POOLS = pool_sizes
+
+
+def _simulate_shard(offset: int, count: int, seed: np.random.SeedSequence, chunk: int = 100_000) -> np.ndarray:
+    """Play `count` random tickets, ticket j against draw (offset + j) mod n"""
+    rng = np.random.default_rng(seed)
+    histogram = np.zeros(BALLS_PER_DRAW + 1, dtype=np.int64)
+    n = len(_WORKER_DRAWS)
+    for start in range(0, count, chunk):
+        positions = (offset + start + np.arange(min(chunk, count - start))) % n
+        masks = tickets_to_masks(random_tickets(rng, _WORKER_POOLS[positions]))
+        histogram += match_histogram(masks, _WORKER_DRAWS[positions])
+    return histogram
+
+
+class Backtester:
+    def __init__(self, history: DrawHistory, cache_dir: Optional[str] = CACHE_DIR):
+        self.history = history
+        self.index = FrequencyIndex(history)
+        self.valid = history.valid_mask()
+        self.draw_masks = history.masks()
+        self.pool_sizes = history.pool_sizes()
+        self.version = history.version()
+        self.cache_dir = cache_dir
+
+    @classmethod
+    def from_sqlite(cls, db_path: str = DEFAULT_DB_PATH, **kwargs) -> 'Backtester':
+        return cls(DrawHistory.from_sqlite(db_path), **kwargs)
+
+    def _cache_path(self, key: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f'{self.version}_{key}.json')
+
+    def _require_draws(self):
+        if not self.valid.any():
+            raise ValueError("History has no draws with published numbers to backtest against")
+
+    def _load_cached(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._cache_path(key)
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                result = json.load(f)
+            result['cached'] = True
+            return result
+        return None
+
+    def _store(self, key: str, result: Dict[str, Any]):
+        path = self._cache_path(key)
+        if path:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(result, f, indent=2)
+
+    @staticmethod
+    def _summarise(key: str, histogram: np.ndarray, seconds: float) -> Dict[str, Any]:
+        tickets = int(histogram.sum())
+        return {
+            'strategy': key,
+            'tickets': tickets,
+            'match_histogram': [int(h) for h in histogram],
+            'mean_matches': float((histogram * np.arange(len(histogram))).sum() / tickets) if tickets else 0.0,
+            'seconds': seconds,
+            'tickets_per_second': tickets / seconds if seconds > 0 else float('inf'),
+            'cached': False,
+        }
+
+    def run(self, strategy: Strategy, use_cache: bool = True) -> Dict[str, Any]:
+        """Replay one strategy over every draw with published numbers"""
+        self._require_draws()
+        key = strategy.key()
+        if use_cache:
+            cached = self._load_cached(key)
+            if cached:
+                return cached
+        start = perf_counter()
+        masks = tickets_to_masks(strategy.tickets(self.history, self.index))
+        histogram = match_histogram(masks[self.valid], self.draw_masks[self.valid])
+        result = self._summarise(key, histogram, perf_counter() - start)
+        result['history_version'] = self.version
+        self._store(key, result)
+        return result
+
+    def monte_carlo(self, tickets: int = 1_000_000, workers: Optional[int] = None, seed: int = 0,
+                    shard_size: int = 250_000, use_cache: bool = True) -> Dict[str, Any]:
+        """Random-ticket baseline: `tickets` simulated tickets cycled through the full history"""
+        self._require_draws()
+        if tickets < 1 or shard_size < 1:
+            raise ValueError(f"tickets and shard_size must be at least 1, got {tickets} and {shard_size}")
+        # shard_size decides how many seeds are spawned, so it is part of the result's identity
+        key = f'montecarlo-{tickets}-{seed}-{shard_size}'
+        if use_cache:
+            cached = self._load_cached(key)
+            if cached:
+                return cached
+        draw_masks = self.draw_masks[self.valid]
+        pool_sizes = self.pool_sizes[self.valid]
+        offsets = list(range(0, tickets, shard_size))
+        seeds = np.random.SeedSequence(seed).spawn(len(offsets))
+        counts = [min(shard_size, tickets - o) for o in offsets]
+
+        start = perf_counter()
+        histogram = np.zeros(BALLS_PER_DRAW + 1, dtype=np.int64)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(draw_masks, pool_sizes)) as executor:
+            for shard in executor.map(_simulate_shard, offsets, counts, seeds):
+                histogram += shard
+        result = self._summarise(key, histogram, perf_counter() - start)
+        result['history_version'] = self.version
+        self._store(key, result)
+        return result
+
+
+def default_strategies() -> List[Strategy]:
+    return [
+        HotNumbers(50), HotNumbers(200),
+        ColdNumbers(50), ColdNumbers(200),
+        FixedPicks([1, 2, 3, 4, 5]),
+        RandomPicks(0),
+    ]
+
+
+def print_result(result: Dict[str, Any]):
+    histogram = ' '.join(f'{h:>9}' for h in result['match_histogram'])
+    cached = ' (cached)' if result.get('cached') else ''
+    print(f"{result['strategy']:<22} {histogram}  mean {result['mean_matches']:.4f}  "
+          f"{result['tickets_per_second']:>14,.0f} tickets/s{cached}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest Cashpot ticket strategies against the draw history')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    parser.add_argument('--columnar', nargs='?', const='', metavar='STORE',
+                        help='read the Arrow store from columnar_export.py instead of SQLite')
+    parser.add_argument('--tickets', type=int, default=1_000_000, help='Monte Carlo tickets to simulate')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args()
+
+    if args.columnar is not None:
+        backtester = Backtester(DrawHistory.from_columnar(args.columnar or None, args.db))
+    else:
+        backtester = Backtester.from_sqlite(args.db)
+    print(f"[*] History version {backtester.version}: {int(backtester.valid.sum())} draws with published numbers")
+    print(f"{'strategy':<22} " + ' '.join(f'{f"{m} match":>9}' for m in range(BALLS_PER_DRAW + 1)))
+    for strategy in default_strategies():
+        print_result(backtester.run(strategy, use_cache=not args.no_cache))
+    print_result(backtester.monte_carlo(args.tickets, workers=args.workers, seed=args.seed,
+                                        use_cache=not args.no_cache))
+
+
+if __name__ == "__main__":
+    main()
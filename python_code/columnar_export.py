@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Columnar export of `lotto_data` to Arrow IPC files (and Parquet for interchange).
+
+The store is a directory of Arrow IPC part files plus a manifest. The manifest records, per
+part, its last draw date, row count and a digest of the lotto_data rows it was built from.
+When lotto_data only gained draws after the store's last date (judged from row counts), an
+export reads just those draws and appends them as one more part. Otherwise (a backfilled or
+removed draw), or with verify, it checks every part's digest against lotto_data and rewrites
+the parts from the first one that no longer matches, which also catches draws edited in
+place. Once too many parts accumulate they are compacted into one. Readers memory-map the parts,
+so column access does not copy or parse anything: `Numbers` is exploded into typed
+Ball1..Ball5 columns and `Jackpot` is stored as a nullable float.
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from draw_history import BALLS_PER_DRAW, DEFAULT_DB_PATH, parse_draw_num, parse_numbers
+from jackpot_series import parse_jackpot, parse_wins
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'columnar')
+MANIFEST = 'manifest.json'
+
+# Compact the store into a single part once it has more parts than this
+MAX_PARTS = 32
+
+BALL_COLUMNS = [f'Ball{i}' for i in range(1, BALLS_PER_DRAW + 1)]
+
+SCHEMA = pa.schema(
+    [('DrawDate', pa.date32()), ('DrawNum', pa.int32())]
+    + [(c, pa.int8()) for c in BALL_COLUMNS]
+    + [
+        ('Numbers', pa.string()),
+        ('Power_Ball', pa.int8()),
+        ('Multiplier', pa.int8()),
+        ('Jackpot', pa.float64()),
+        ('Wins', pa.int16()),
+    ]
+)
+
+
+def _parse_small_int(value: Any) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+
+def rows_to_table(rows: List[tuple]) -> pa.Table:
+    """Typed table from (DrawDate, DrawNum, Numbers, Power_Ball, Multiplier, Jackpot, Wins) rows"""
+    balls = np.array([parse_numbers(r[2]) for r in rows], dtype=np.int8).reshape(-1, BALLS_PER_DRAW)
+    jackpots = np.array([parse_jackpot(r[5]) for r in rows], dtype=np.float64)
+    columns = [
+        pa.array(np.array([str(r[0])[:10] for r in rows], dtype='datetime64[D]'), type=pa.date32()),
+        pa.array(np.array([parse_draw_num(r[1]) for r in rows], dtype=np.int32)),
+    ]
+    columns += [pa.array(balls[:, i]) for i in range(BALLS_PER_DRAW)]
+    columns += [
+        pa.array([str(r[2]) for r in rows], type=pa.string()),
+        pa.array(np.array([_parse_small_int(r[3]) for r in rows], dtype=np.int8)),
+        pa.array(np.array([_parse_small_int(r[4]) for r in rows], dtype=np.int8)),
+        pa.array(jackpots, mask=np.isnan(jackpots)),
+        pa.array(np.array([parse_wins(r[6]) for r in rows], dtype=np.int16)),
+    ]
+    return pa.Table.from_arrays(columns, schema=SCHEMA)
+
+
+DIGEST_MODULUS = 1 << 64
+
+EXPORT_QUERY = (
+    "SELECT DrawDate, DrawNum, Numbers, Power_Ball, Multiplier, Jackpot, Wins FROM lotto_data "
+    "ORDER BY DrawDate, CAST(DrawNum AS INTEGER)"
+)
+
+# The draws after a date; date(?, '+1 day') also matches DrawDate values stored with a time part
+APPEND_QUERY = (
+    "SELECT DrawDate, DrawNum, Numbers, Power_Ball, Multiplier, Jackpot, Wins FROM lotto_data "
+    "WHERE DrawDate >= date(?, '+1 day') ORDER BY DrawDate, CAST(DrawNum AS INTEGER)"
+)
+
+
+def _row_hash(row: tuple) -> int:
+    return int.from_bytes(hashlib.blake2b(repr(row).encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _part_name(part: Any) -> str:
+    return part['name'] if isinstance(part, dict) else part
+
+
+def _empty_manifest() -> Dict[str, Any]:
+    return {'parts': [], 'rows': 0, 'last_draw_date': None}
+
+
+def _read_manifest(store_dir: str) -> Dict[str, Any]:
+    path = os.path.join(store_dir, MANIFEST)
+    if not os.path.exists(path):
+        return _empty_manifest()
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _write_manifest(store_dir: str, manifest: Dict[str, Any]):
+    path = os.path.join(store_dir, MANIFEST)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def _write_part(store_dir: str, table: pa.Table, index: int) -> str:
+    name = f'part-{index:05d}.arrow'
+    with pa.OSFile(os.path.join(store_dir, name), 'wb') as sink:
+        with ipc.new_file(sink, SCHEMA) as writer:
+            writer.write_table(table)
+    return name
+
+
+def _read_rows(conn: sqlite3.Connection, query: str, params: tuple = ()) -> Tuple[List[tuple], List[str], List[int]]:
+    """lotto_data rows in store order, with their dates and hashes"""
+    rows = conn.execute(query, params).fetchall()
+    return rows, [str(r[0])[:10] for r in rows], [_row_hash(r) for r in rows]
+
+
+def _appended_only(conn: sqlite3.Connection, manifest: Dict[str, Any]) -> bool:
+    """Whether lotto_data still has exactly the store's rows up to its last date, so only newer draws need reading"""
+    if not manifest['parts'] or not all(isinstance(part, dict) for part in manifest['parts']):
+        return False
+    covered = conn.execute(
+        "SELECT COUNT(*) FROM lotto_data WHERE DrawDate < date(?, '+1 day')", (manifest['last_draw_date'],)
+    ).fetchone()[0]
+    return covered == manifest['rows']
+
+
+def _current_parts(manifest: Dict[str, Any], dates: List[str], hashes: List[int]) -> Tuple[int, int]:
+    """(parts still matching lotto_data, rows they cover); stops at the first part that differs"""
+    kept, start = 0, 0
+    for part in manifest['parts']:
+        # Stores written before parts carried digests cannot be checked and are rebuilt
+        if not isinstance(part, dict):
+            break
+        end = bisect.bisect_right(dates, part['last_draw_date'], lo=start)
+        if end - start != part['rows'] or sum(hashes[start:end]) % DIGEST_MODULUS != part['digest']:
+            break
+        kept, start = kept + 1, end
+    return kept, start
+
+
+def is_current(db_path: str = DEFAULT_DB_PATH, store_dir: str = DEFAULT_STORE_DIR) -> bool:
+    """
+    Whether the store's row count and last draw date match lotto_data. This reads no rows, so
+    it does not notice draws edited in place; `export(verify=True)` does.
+    """
+    manifest = _read_manifest(store_dir)
+    conn = sqlite3.connect(db_path)
+    try:
+        count, last_date = conn.execute("SELECT COUNT(*), MAX(DrawDate) FROM lotto_data").fetchone()
+    finally:
+        conn.close()
+    return count == manifest['rows'] and (str(last_date)[:10] if last_date else None) == manifest['last_draw_date']
+
+
+def export(db_path: str = DEFAULT_DB_PATH, store_dir: str = DEFAULT_STORE_DIR, rebuild: bool = False,
+           verify: bool = False) -> int:
+    """Append new draws, rewriting parts that no longer match lotto_data; returns the number of rows written"""
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = _read_manifest(store_dir)
+    conn = sqlite3.connect(db_path)
+    try:
+        if not (rebuild or verify) and _appended_only(conn, manifest):
+            # Only the draws after the store's last date are read and hashed
+            rows, dates, hashes = _read_rows(conn, APPEND_QUERY, (manifest['last_draw_date'],))
+            kept, start, offset = len(manifest['parts']), 0, manifest['rows']
+        else:
+            rows, dates, hashes = _read_rows(conn, EXPORT_QUERY)
+            kept, start = (0, 0) if rebuild else _current_parts(manifest, dates, hashes)
+            offset = 0
+    finally:
+        conn.close()
+
+    stale = manifest['parts'][kept:]
+    if stale and not rebuild:
+        print(f"[*] {len(stale)} part(s) no longer match lotto_data; re-exporting from row {start}")
+    next_index = int(_part_name(manifest['parts'][-1])[5:10]) + 1 if manifest['parts'] else 0
+    manifest['parts'] = manifest['parts'][:kept]
+    if start < len(rows):
+        manifest['parts'].append({
+            'name': _write_part(store_dir, rows_to_table(rows[start:]), next_index),
+            'last_draw_date': dates[-1],
+            'rows': len(rows) - start,
+            'digest': sum(hashes[start:]) % DIGEST_MODULUS,
+        })
+    manifest['rows'] = offset + len(rows)
+    if dates or not offset:
+        manifest['last_draw_date'] = dates[-1] if dates else None
+    if not stale and start == len(rows):
+        return 0
+    _write_manifest(store_dir, manifest)
+    for part in stale:
+        path = os.path.join(store_dir, _part_name(part))
+        if os.path.exists(path):
+            os.remove(path)
+
+    if len(manifest['parts']) > MAX_PARTS:
+        compact(store_dir)
+    return len(rows) - start
+
+
+def compact(store_dir: str = DEFAULT_STORE_DIR):
+    """Rewrite every part into a single part"""
+    manifest = _read_manifest(store_dir)
+    if len(manifest['parts']) <= 1:
+        return
+    table = open_table(store_dir).combine_chunks()
+    old_parts = manifest['parts']
+    manifest['parts'] = [{
+        'name': _write_part(store_dir, table, int(_part_name(old_parts[-1])[5:10]) + 1),
+        'last_draw_date': old_parts[-1]['last_draw_date'],
+        'rows': sum(part['rows'] for part in old_parts),
+        # Row hashes are summed, so the digest of the merged part is the sum of the parts' digests
+        'digest': sum(part['digest'] for part in old_parts) % DIGEST_MODULUS,
+    }]
+    _write_manifest(store_dir, manifest)
+    for part in old_parts:
+        os.remove(os.path.join(store_dir, _part_name(part)))
+
+
+def open_table(store_dir: str = DEFAULT_STORE_DIR, columns: Optional[List[str]] = None) -> pa.Table:
+    """Memory-map every part; the returned table's buffers point straight into the files"""
+    manifest = _read_manifest(store_dir)
+    tables = []
+    for part in manifest['parts']:
+        reader = ipc.open_file(pa.memory_map(os.path.join(store_dir, _part_name(part)), 'r'))
+        table = reader.read_all()
+        tables.append(table.select(columns) if columns else table)
+    if not tables:
+        schema = pa.schema([SCHEMA.field(c) for c in columns]) if columns else SCHEMA
+        return schema.empty_table()
+    return pa.concat_tables(tables)
+
+
+def write_parquet(path: str, store_dir: str = DEFAULT_STORE_DIR):
+    """Single Parquet file of the whole store, for tools that do not read Arrow IPC"""
+    pq.write_table(open_table(store_dir), path, compression='zstd')
+
+
+def _load_with_sqlite(db_path: str) -> int:
+    """The current analytics path: row tuples, string splitting and pd.Series counting"""
+    import pandas as pd
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT * FROM lotto_data ORDER BY DrawDate DESC").fetchall()
+    conn.close()
+    flat_numbers = [int(number) for row in rows for number in row[2].split('|')]
+    jackpots = pd.Series([row[5] for row in rows]).apply(lambda v: float(str(v).replace('$', '').replace(',', '')))
+    counts = pd.Series(flat_numbers).value_counts()
+    return int(counts.sum()) + len(jackpots)
+
+
+def _load_with_arrow(store_dir: str) -> int:
+    table = open_table(store_dir, BALL_COLUMNS + ['Jackpot'])
+    counts = sum(np.bincount(table[c].to_numpy().astype(np.intp), minlength=256) for c in BALL_COLUMNS)
+    jackpots = table['Jackpot'].to_numpy()
+    return int(counts.sum()) + len(jackpots)
+
+
+def _peak_rss_mb() -> float:
+    """Peak RSS of this process; VmHWM resets on exec, unlike ru_maxrss which children inherit"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _measure(kind: str, path: str) -> Dict[str, float]:
+    """Run one loader in this process and report wall time and peak RSS"""
+    baseline = _peak_rss_mb()
+    start = perf_counter()
+    checksum = _load_with_sqlite(path) if kind == 'sqlite' else _load_with_arrow(path)
+    seconds = perf_counter() - start
+    return {'seconds': seconds, 'peak_rss_mb': _peak_rss_mb(), 'added_rss_mb': _peak_rss_mb() - baseline, 'checksum': checksum}
+
+
+def _synthetic_db(path: str, rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    balls = np.sort(np.argsort(rng.random((rows, 20)), axis=1)[:, :BALLS_PER_DRAW] + 1, axis=1)
+    dates = (np.datetime64('1900-01-01') + np.arange(rows)).astype(str)
+    jackpots = rng.uniform(100_000, 500_000, rows).round(2)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        'CREATE TABLE lotto_data ("DrawDate" DATE NOT NULL PRIMARY KEY, "DrawNum" VARCHAR, "Numbers" VARCHAR, '
+        '"Power_Ball" VARCHAR, "Multiplier" VARCHAR, "Jackpot" VARCHAR, "Wins" VARCHAR, "uniqueId" VARCHAR, '
+        'last_updated DATE, date_created DATE)'
+    )
+    conn.executemany(
+        'INSERT INTO lotto_data VALUES (?, ?, ?, ?, ?, ?, ?, NULL, NULL, NULL)',
+        ((dates[i], str(i + 1), '|'.join(map(str, balls[i])), '1', '2', str(jackpots[i]), '3') for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+
+def benchmark(db_path: str = DEFAULT_DB_PATH, synthetic_rows: Optional[int] = None):
+    """Compare load time and peak RSS of the SQLite + pd.Series path against memory-mapped Arrow"""
+    with tempfile.TemporaryDirectory() as tmp:
+        if synthetic_rows:
+            db_path = os.path.join(tmp, 'synthetic.db')
+            _synthetic_db(db_path, synthetic_rows)
+        store_dir = os.path.join(tmp, 'columnar')
+        start = perf_counter()
+        rows = export(db_path, store_dir)
+        print(f"[*] Exported {rows} draws in {perf_counter() - start:.2f}s")
+
+        results = {}
+        for kind, path in (('sqlite', db_path), ('arrow', store_dir)):
+            # Fresh interpreter per loader so peak RSS is not shared
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--measure', kind, path],
+                check=True, capture_output=True, text=True
+            ).stdout
+            results[kind] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'loader':<8} {'seconds':>10} {'peak RSS (MB)':>15} {'added by load (MB)':>20}")
+    for kind, result in results.items():
+        print(f"{kind:<8} {result['seconds']:>10.4f} {result['peak_rss_mb']:>15.1f} {result['added_rss_mb']:>20.1f}")
+    if results['sqlite']['checksum'] != results['arrow']['checksum']:
+        print("[*] WARNING: loaders disagree on the number of balls/jackpots read")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export lotto_data to a memory-mappable Arrow store')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    parser.add_argument('--store', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--rebuild', action='store_true', help='discard existing parts and export everything')
+    parser.add_argument('--verify', action='store_true',
+                        help='check every part against lotto_data, re-exporting draws edited in place')
+    parser.add_argument('--parquet', metavar='PATH', help='also write the whole store to a Parquet file')
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--rows', type=int, default=None, help='benchmark on a synthetic database of this many draws')
+    parser.add_argument('--measure', nargs=2, metavar=('KIND', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(_measure(*args.measure)))
+    elif args.benchmark:
+        benchmark(args.db, args.rows)
+    else:
+        rows = export(args.db, args.store, rebuild=args.rebuild, verify=args.verify)
+        print(f"[*] Exported {rows} draws to {args.store}")
+        if args.parquet:
+            write_parquet(args.parquet, args.store)
+            print(f"[*] Wrote {args.parquet}")
+
+
+if __name__ == "__main__":
+    main()
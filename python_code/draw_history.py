@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Load the Cashpot draw history from the local SQLite database into typed NumPy arrays.
+Analytics modules share this loader so `lotto_data` is parsed once per run instead of
+re-splitting the `Numbers` strings in every consumer.
+"""
+
+import hashlib
+import os
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'Lotto_Results_Database(3).db')
+
+# Cashpot draws five balls from 1-20; draws between 2007 and 2010 used 1-25, and "0|0|0|0|0" marks a draw with no published numbers
+BALLS_PER_DRAW = 5
+POOL_SIZE = 20
+MAX_BALL = 25
+
+
+def parse_numbers(numbers: str) -> List[int]:
+    """Split a `Numbers` value such as '5|6|14|17|18' into integers"""
+    try:
+        balls = [int(n) for n in str(numbers).split('|')]
+    except ValueError:
+        return [0] * BALLS_PER_DRAW
+    if len(balls) != BALLS_PER_DRAW:
+        return [0] * BALLS_PER_DRAW
+    return balls
+
+
+def parse_draw_num(draw_num: Any) -> int:
+    """Convert a `DrawNum`/`Draw#` value to an integer, 0 when missing"""
+    try:
+        return int(draw_num)
+    except (TypeError, ValueError):
+        return 0
+
+
+class DrawHistory:
+    """Draw history ordered by draw date and draw number"""
+
+    def __init__(self, dates: np.ndarray, draw_nums: np.ndarray, balls: np.ndarray):
+        self.dates = dates.astype('datetime64[D]')
+        self.draw_nums = draw_nums.astype(np.int64)
+        self.balls = balls.astype(np.int8).reshape(-1, BALLS_PER_DRAW)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @classmethod
+    def from_rows(cls, rows: List[Tuple[Any, Any, Any]]) -> 'DrawHistory':
+        """Build from (DrawDate, DrawNum, Numbers) tuples already in draw order"""
+        dates = np.array([str(r[0])[:10] for r in rows], dtype='datetime64[D]')
+        draw_nums = np.array([parse_draw_num(r[1]) for r in rows], dtype=np.int64)
+        balls = np.array([parse_numbers(r[2]) for r in rows], dtype=np.int8).reshape(-1, BALLS_PER_DRAW)
+        return cls(dates, draw_nums, balls)
+
+    @classmethod
+    def from_scraped(cls, scraped_data: List[Dict[str, Any]]) -> 'DrawHistory':
+        """Build from scraper records (Date, Draw#, Numbers), sorting them into draw order"""
+        rows = sorted(
+            ((r.get('Date'), r.get('Draw#'), r.get('Numbers')) for r in scraped_data if r.get('Date')),
+            key=lambda r: (str(r[0])[:10], parse_draw_num(r[1]))
+        )
+        return cls.from_rows(rows)
+
+    @classmethod
+    def from_sqlite(cls, db_path: str = DEFAULT_DB_PATH) -> 'DrawHistory':
+        """Load every row of `lotto_data` in (DrawDate, DrawNum) order"""
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute(
+                "SELECT DrawDate, DrawNum, Numbers FROM lotto_data "
+                "ORDER BY DrawDate, CAST(DrawNum AS INTEGER)"
+            ).fetchall()
+        finally:
+            conn.close()
+        return cls.from_rows(rows)
+
+    @classmethod
+    def from_columnar(cls, store_dir: Optional[str] = None, db_path: Optional[str] = None) -> 'DrawHistory':
+        """
+        Load from the memory-mapped Arrow store written by columnar_export.py (requires pyarrow).
+        With `db_path`, warns when the store's row count or last draw date differ from that database's lotto_data.
+        """
+        from columnar_export import BALL_COLUMNS, DEFAULT_STORE_DIR, is_current, open_table
+        store_dir = store_dir or DEFAULT_STORE_DIR
+        if db_path and not is_current(db_path, store_dir):
+            print(f"[*] Warning: {store_dir} is out of date with {db_path}; run columnar_export.py to refresh it")
+        table = open_table(store_dir, ['DrawDate', 'DrawNum'] + BALL_COLUMNS)
+        return cls(
+            table['DrawDate'].to_numpy(),
+            table['DrawNum'].to_numpy(),
+            np.column_stack([table[c].to_numpy() for c in BALL_COLUMNS]),
+        )
+
+    def valid_mask(self) -> np.ndarray:
+        """Rows that carry real numbers (not the 0|0|0|0|0 placeholder)"""
+        return (self.balls > 0).all(axis=1)
+
+    def pool_sizes(self) -> np.ndarray:
+        """Size of the ball pool each draw was made from, inferred from the span of draws using balls above POOL_SIZE"""
+        sizes = np.full(len(self), POOL_SIZE, dtype=np.int8)
+        large = np.flatnonzero((self.balls > POOL_SIZE).any(axis=1))
+        if len(large):
+            sizes[large[0]:large[-1] + 1] = MAX_BALL
+        return sizes
+
+    def masks(self) -> np.ndarray:
+        """Each draw as a uint32 bitmask with bit b set for ball b"""
+        return np.bitwise_or.reduce(np.left_shift(np.uint32(1), self.balls.astype(np.uint32)), axis=1)
+
+    def version(self) -> str:
+        """Content fingerprint of the history, used to key cached analytics"""
+        digest = hashlib.sha256()
+        for column in (self.dates.view(np.int64), self.draw_nums, self.balls):
+            digest.update(np.ascontiguousarray(column).tobytes())
+        return digest.hexdigest()[:16]
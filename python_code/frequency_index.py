@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Per-number prefix-count index over the draw history.
+
+Row i of the prefix array holds how often every ball was drawn in the first i draws,
+so the frequency table for any window of draws is the difference of two rows:
+O(log n) to locate a date window and O(MAX_BALL) to subtract, independent of history length.
+"""
+
+import sys
+from time import perf_counter
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from draw_history import BALLS_PER_DRAW, DEFAULT_DB_PATH, MAX_BALL, DrawHistory, parse_draw_num, parse_numbers
+
+
+class FrequencyIndex:
+    def __init__(self, history: DrawHistory):
+        self._size = 0
+        self._dates = np.empty(0, dtype='datetime64[D]')
+        self._draw_nums = np.empty(0, dtype=np.int64)
+        self._prefix = np.zeros((1, MAX_BALL + 1), dtype=np.int32)
+        self._build(history.dates, history.draw_nums, history.balls)
+
+    @classmethod
+    def from_sqlite(cls, db_path: str = DEFAULT_DB_PATH) -> 'FrequencyIndex':
+        return cls(DrawHistory.from_sqlite(db_path))
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _one_hot(balls: np.ndarray) -> np.ndarray:
+        """Per-draw ball counts, shape (n, MAX_BALL + 1)"""
+        n = len(balls)
+        flat = np.repeat(np.arange(n) * (MAX_BALL + 1), BALLS_PER_DRAW) + balls.reshape(-1).astype(np.intp)
+        return np.bincount(flat, minlength=n * (MAX_BALL + 1)).astype(np.int32).reshape(n, MAX_BALL + 1)
+
+    def _build(self, dates: np.ndarray, draw_nums: np.ndarray, balls: np.ndarray):
+        n = len(dates)
+        capacity = max(16, n * 2)
+        self._dates = np.empty(capacity, dtype='datetime64[D]')
+        self._draw_nums = np.empty(capacity, dtype=np.int64)
+        self._prefix = np.zeros((capacity + 1, MAX_BALL + 1), dtype=np.int32)
+        self._dates[:n] = dates
+        self._draw_nums[:n] = draw_nums
+        np.cumsum(self._one_hot(balls), axis=0, out=self._prefix[1:n + 1])
+        self._size = n
+
+    def _grow(self):
+        capacity = len(self._dates) * 2
+        self._dates = np.resize(self._dates, capacity)
+        self._draw_nums = np.resize(self._draw_nums, capacity)
+        prefix = np.zeros((capacity + 1, MAX_BALL + 1), dtype=np.int32)
+        prefix[:self._size + 1] = self._prefix[:self._size + 1]
+        self._prefix = prefix
+
+    def append(self, date: Any, draw_num: Any, numbers: Any) -> bool:
+        """
+        Add one draw; returns False when a draw for that date is already indexed. Raises
+        ValueError unless the draw has BALLS_PER_DRAW balls from 1 to MAX_BALL (or is the
+        all-zero placeholder for a draw without published numbers).
+        """
+        day = np.datetime64(str(date)[:10], 'D')
+        draw = parse_draw_num(draw_num)
+        balls = numbers if isinstance(numbers, (list, tuple, np.ndarray)) else parse_numbers(numbers)
+        balls = np.asarray(balls, dtype=np.intp)
+        in_range = ((balls >= 1) & (balls <= MAX_BALL)).all()
+        if balls.shape != (BALLS_PER_DRAW,) or not (in_range or not balls.any()):
+            raise ValueError(f"Draw {draw_num} on {str(date)[:10]} has numbers {numbers!r}; "
+                             f"expected {BALLS_PER_DRAW} balls from 1 to {MAX_BALL}")
+        row = np.zeros(MAX_BALL + 1, dtype=np.int32)
+        np.add.at(row, balls, 1)
+
+        n = self._size
+        pos = int(np.searchsorted(self._dates[:n], day, side='left'))
+        if pos < n and self._dates[pos] == day:
+            return False
+        if n == len(self._dates):
+            self._grow()
+
+        if pos < n:
+            # Out-of-order backfill: shift the tail and add the new draw to every later prefix row
+            self._dates[pos + 1:n + 1] = self._dates[pos:n]
+            self._draw_nums[pos + 1:n + 1] = self._draw_nums[pos:n]
+            self._prefix[pos + 2:n + 2] = self._prefix[pos + 1:n + 1] + row
+        self._dates[pos] = day
+        self._draw_nums[pos] = draw
+        self._prefix[pos + 1] = self._prefix[pos] + row
+        self._size = n + 1
+        return True
+
+    def on_insert(self, records: List[Dict[str, Any]]) -> int:
+        """Insert hook for scraper records (Date, Draw#, Numbers); returns how many were indexed"""
+        added = 0
+        for record in sorted(records, key=lambda r: str(r.get('Date'))):
+            if record.get('Date') and self.append(record['Date'], record.get('Draw#'), record.get('Numbers')):
+                added += 1
+        return added
+
+    def counts_between_positions(self, start: int, stop: int) -> np.ndarray:
+        """Ball counts for draws [start, stop) in draw order, indexed by ball number"""
+        start = min(max(start, 0), self._size)
+        stop = min(max(stop, start), self._size)
+        return self._prefix[stop] - self._prefix[start]
+
+    def counts_between(self, start_date: Any = None, end_date: Any = None) -> np.ndarray:
+        """Ball counts for draws dated within [start_date, end_date], both inclusive and optional"""
+        dates = self._dates[:self._size]
+        start = 0 if start_date is None else int(np.searchsorted(dates, np.datetime64(str(start_date)[:10], 'D'), side='left'))
+        stop = self._size if end_date is None else int(np.searchsorted(dates, np.datetime64(str(end_date)[:10], 'D'), side='right'))
+        return self.counts_between_positions(start, stop)
+
+    def counts_last(self, n: int) -> np.ndarray:
+        """Ball counts for the most recent n draws"""
+        return self.counts_between_positions(self._size - n, self._size)
+
+    def window_counts(self, lookback: int) -> np.ndarray:
+        """Ball counts over the `lookback` draws preceding each draw, shape (n, MAX_BALL + 1)"""
+        stops = np.arange(self._size)
+        starts = np.maximum(stops - lookback, 0)
+        return self._prefix[stops] - self._prefix[starts]
+
+    @staticmethod
+    def most_common(counts: np.ndarray, k: int = 5) -> List[Tuple[int, int]]:
+        """(ball, count) pairs for the k most drawn balls, ignoring the 0 placeholder"""
+        balls = np.arange(1, MAX_BALL + 1)
+        order = np.lexsort((balls, -counts[1:]))[:k]
+        return [(int(balls[i]), int(counts[1 + i])) for i in order]
+
+    @staticmethod
+    def as_dict(counts: np.ndarray) -> Dict[int, int]:
+        return {ball: int(counts[ball]) for ball in range(1, MAX_BALL + 1)}
+
+
+def _synthetic_history(n: int, seed: int = 0) -> DrawHistory:
+    rng = np.random.default_rng(seed)
+    dates = np.datetime64('1900-01-01') + np.arange(n)
+    balls = np.sort(np.argsort(rng.random((n, MAX_BALL)), axis=1)[:, :BALLS_PER_DRAW] + 1, axis=1)
+    return DrawHistory(dates, np.arange(1, n + 1), balls)
+
+
+def benchmark(sizes: Tuple[int, ...] = (1_000, 10_000, 100_000, 1_000_000), queries: int = 10_000):
+    """Show that window queries stay flat while history grows"""
+    print(f"{'draws':>10} {'build (ms)':>12} {'date window (us)':>18} {'last N (us)':>13} {'append (us)':>13}")
+    for n in sizes:
+        history = _synthetic_history(n)
+        t0 = perf_counter()
+        index = FrequencyIndex(history)
+        build_ms = (perf_counter() - t0) * 1e3
+
+        rng = np.random.default_rng(1)
+        starts = rng.integers(0, n, queries)
+        lengths = rng.integers(1, n, queries)
+        start_dates = [str(history.dates[s]) for s in starts]
+        end_dates = [str(history.dates[min(s + l, n - 1)]) for s, l in zip(starts, lengths)]
+
+        t0 = perf_counter()
+        for s, e in zip(start_dates, end_dates):
+            index.counts_between(s, e)
+        window_us = (perf_counter() - t0) / queries * 1e6
+
+        t0 = perf_counter()
+        for l in lengths:
+            index.counts_last(int(l))
+        last_us = (perf_counter() - t0) / queries * 1e6
+
+        next_day = history.dates[-1]
+        t0 = perf_counter()
+        for i in range(1, 1001):
+            index.append(next_day + i, n + i, [1, 2, 3, 4, 5])
+        append_us = (perf_counter() - t0) / 1000 * 1e6
+
+        print(f"{n:>10} {build_ms:>12.1f} {window_us:>18.2f} {last_us:>13.2f} {append_us:>13.2f}")
+
+
+if __name__ == "__main__":
+    if '--benchmark' in sys.argv:
+        benchmark()
+    else:
+        index = FrequencyIndex.from_sqlite(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_PATH)
+        print(f"[*] Indexed {len(index)} draws")
+        print("[*] Top 5 all time :", index.most_common(index.counts_between()))
+        print("[*] Top 5 last 100 :", index.most_common(index.counts_last(100)))
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Jackpot time series over the Cashpot draw history.
+
+`Jackpot` and `Wins` are parsed once into float/int arrays, and the per-draw features
+(rollover streaks, jackpot resets, growth per draw and rolling means) are computed with
+cumulative array operations. Results are materialized into a small `jackpot_series`
+table next to `lotto_data`. Each row keeps the raw lotto_data values it was computed from,
+so a run can find the earliest draw that was added, changed or removed since (including
+backfilled months), recompute only from there, and seed streaks and rolling windows from
+the rows before it. Recomputed rows are flagged as pending until they reach Supabase.
+"""
+
+import sqlite3
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from draw_history import DEFAULT_DB_PATH, parse_draw_num
+
+ROLLING_WINDOWS = (10, 50)
+
+SERIES_COLUMNS = ['DrawDate', 'DrawNum', 'Jackpot', 'Wins', 'Rollover', 'Streak', 'MaxStreak', 'Reset', 'Growth'] + \
+    [f'RollingMean{w}' for w in ROLLING_WINDOWS]
+
+# Raw lotto_data values a jackpot_series row was computed from, as one comparable string
+SOURCE_SQL = "IFNULL(l.DrawNum, '') || '|' || IFNULL(l.Jackpot, '') || '|' || IFNULL(l.Wins, '')"
+
+
+def parse_jackpot(value: Any) -> float:
+    """Jackpot string such as '$1,234.50' to float; 0 and unparseable values become NaN (not published)"""
+    try:
+        jackpot = float(str(value).replace('$', '').replace(',', ''))
+    except ValueError:
+        return np.nan
+    return jackpot if jackpot > 0 else np.nan
+
+
+def parse_wins(value: Any) -> int:
+    """Wins to int; -1 when missing ('X' is stored as -1 by the scraper)"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+
+class JackpotSeries:
+    def __init__(self, dates: np.ndarray, draw_nums: np.ndarray, jackpots: np.ndarray, wins: np.ndarray):
+        self.dates = dates.astype('datetime64[D]')
+        self.draw_nums = draw_nums.astype(np.int64)
+        self.jackpots = jackpots.astype(np.float64)
+        self.wins = wins.astype(np.int64)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple[Any, Any, Any, Any]]) -> 'JackpotSeries':
+        """Build from (DrawDate, DrawNum, Jackpot, Wins) tuples in draw order"""
+        return cls(
+            np.array([str(r[0])[:10] for r in rows], dtype='datetime64[D]'),
+            np.array([parse_draw_num(r[1]) for r in rows], dtype=np.int64),
+            np.array([parse_jackpot(r[2]) for r in rows], dtype=np.float64),
+            np.array([parse_wins(r[3]) for r in rows], dtype=np.int64),
+        )
+
+    def features(self, skip: int = 0, streak: int = 0, max_streak: int = 0,
+                 previous_jackpot: float = np.nan, previous_rollover: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Per-draw features for draws[skip:]. The first `skip` draws are only context for the
+        rolling means; streak, max_streak, previous_jackpot and previous_rollover describe
+        the draw just before draws[skip].
+        """
+        jackpots = self.jackpots
+        known = ~np.isnan(jackpots)
+        sums = np.concatenate([[0.0], np.cumsum(np.where(known, jackpots, 0.0))])
+        counts = np.concatenate([[0], np.cumsum(known)])
+        positions = np.arange(skip, len(self)) + 1
+        rolling = {}
+        for window in ROLLING_WINDOWS:
+            starts = np.maximum(positions - window, 0)
+            n = counts[positions] - counts[starts]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                rolling[f'RollingMean{window}'] = np.where(n > 0, (sums[positions] - sums[starts]) / n, np.nan)
+
+        jackpots = jackpots[skip:]
+        wins = self.wins[skip:]
+        rollover = wins == 0
+
+        # Length of the rollover run ending at each draw: running count minus the count at the last non-rollover draw
+        runs = np.cumsum(rollover)
+        streaks = runs - np.maximum.accumulate(np.where(rollover, 0, runs))
+        first_break = int(np.argmin(rollover)) if not rollover.all() else len(rollover)
+        streaks[:first_break] += streak
+        max_streaks = np.maximum.accumulate(np.maximum(streaks, max_streak)) if len(streaks) else streaks
+
+        reset = (wins > 0) & np.concatenate([[previous_rollover], rollover[:-1]])
+        growth = np.diff(jackpots, prepend=previous_jackpot)
+
+        return {
+            'DrawDate': self.dates[skip:],
+            'DrawNum': self.draw_nums[skip:],
+            'Jackpot': jackpots,
+            'Wins': wins,
+            'Rollover': rollover,
+            'Streak': streaks,
+            'MaxStreak': max_streaks,
+            'Reset': reset,
+            'Growth': growth,
+            **rolling,
+        }
+
+
+def _ensure_table(conn: sqlite3.Connection):
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS jackpot_series (
+            "DrawDate" DATE NOT NULL PRIMARY KEY,
+            "DrawNum" INTEGER,
+            "Jackpot" REAL,
+            "Wins" INTEGER,
+            "Rollover" INTEGER,
+            "Streak" INTEGER,
+            "MaxStreak" INTEGER,
+            "Reset" INTEGER,
+            "Growth" REAL,
+            """ + ',\n            '.join(f'"RollingMean{w}" REAL' for w in ROLLING_WINDOWS) + """,
+            "Source" TEXT,
+            "Pending" INTEGER DEFAULT 1
+        )"""
+    )
+    # Tables materialized before Source/Pending existed: NULL sources make the next run recompute everything
+    existing = {row[1] for row in conn.execute('PRAGMA table_info(jackpot_series)')}
+    if 'Source' not in existing:
+        conn.execute('ALTER TABLE jackpot_series ADD COLUMN "Source" TEXT')
+    if 'Pending' not in existing:
+        conn.execute('ALTER TABLE jackpot_series ADD COLUMN "Pending" INTEGER DEFAULT 1')
+
+
+def _none_if_nan(value: Any) -> Any:
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def _first_stale_date(conn: sqlite3.Connection) -> Optional[str]:
+    """Earliest draw date added to, changed in or removed from lotto_data since it was materialized"""
+    return conn.execute(
+        f"""SELECT MIN(d) FROM (
+            SELECT l.DrawDate AS d FROM lotto_data l
+            LEFT JOIN jackpot_series j ON j."DrawDate" = l.DrawDate
+            WHERE j."DrawDate" IS NULL OR j."Source" IS NOT ({SOURCE_SQL})
+            UNION ALL
+            SELECT j."DrawDate" FROM jackpot_series j
+            WHERE NOT EXISTS (SELECT 1 FROM lotto_data l WHERE l.DrawDate = j."DrawDate")
+        )"""
+    ).fetchone()[0]
+
+
+def materialize(db_path: str = DEFAULT_DB_PATH) -> int:
+    """Recompute jackpot_series from the earliest added, changed or removed lotto_data draw; returns rows written"""
+    conn = sqlite3.connect(db_path)
+    try:
+        _ensure_table(conn)
+        start = _first_stale_date(conn)
+        if start is None:
+            return 0
+
+        # Everything from the first stale draw on is rebuilt, so rows of removed draws go too
+        conn.execute('DELETE FROM jackpot_series WHERE "DrawDate" >= ?', (start,))
+        last = conn.execute(
+            'SELECT "DrawDate", "Jackpot", "Rollover", "Streak", "MaxStreak" FROM jackpot_series '
+            'ORDER BY "DrawDate" DESC LIMIT 1'
+        ).fetchone()
+
+        seed = {}
+        context = []
+        if last:
+            seed = {
+                'previous_jackpot': np.nan if last[1] is None else last[1],
+                'previous_rollover': bool(last[2]),
+                'streak': last[3],
+                'max_streak': last[4],
+            }
+            # The rolling windows need the draws just before the first recomputed one
+            context = conn.execute(
+                "SELECT DrawDate, DrawNum, Jackpot, Wins FROM lotto_data WHERE DrawDate < ? "
+                "ORDER BY DrawDate DESC LIMIT ?",
+                (start, max(ROLLING_WINDOWS) - 1)
+            ).fetchall()[::-1]
+        rows = conn.execute(
+            f"SELECT l.DrawDate, l.DrawNum, l.Jackpot, l.Wins, {SOURCE_SQL} FROM lotto_data l "
+            "WHERE l.DrawDate >= ? ORDER BY l.DrawDate, CAST(l.DrawNum AS INTEGER)",
+            (start,)
+        ).fetchall()
+
+        if rows:
+            features = JackpotSeries.from_rows(context + [r[:4] for r in rows]).features(skip=len(context), **seed)
+            columns = [features[c] for c in SERIES_COLUMNS]
+            columns[0] = features['DrawDate'].astype(str)
+            records = [
+                tuple(_none_if_nan(v.item() if hasattr(v, 'item') else v) for v in row) + (source[4], 1)
+                for row, source in zip(zip(*columns), rows)
+            ]
+            placeholders = ', '.join('?' for _ in range(len(SERIES_COLUMNS) + 2))
+            quoted = ', '.join(f'"{c}"' for c in SERIES_COLUMNS + ['Source', 'Pending'])
+            conn.executemany(f'INSERT OR REPLACE INTO jackpot_series ({quoted}) VALUES ({placeholders})', records)
+        conn.commit()
+        return len(rows)
+    finally:
+        conn.close()
+
+
+def read_series(db_path: str = DEFAULT_DB_PATH, since: Optional[str] = None,
+                pending: bool = False) -> List[Dict[str, Any]]:
+    """
+    Materialized rows keyed like the Supabase jackpot_series table. With `since` and/or
+    `pending`, only rows after `since` or recomputed since the last mark_synced() are returned.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        _ensure_table(conn)
+        quoted = ', '.join(f'"{c}"' for c in SERIES_COLUMNS)
+        conditions, params = [], []
+        if since:
+            conditions.append('"DrawDate" > ?')
+            params.append(since)
+        if pending:
+            conditions.append('"Pending" = 1')
+        where = f' WHERE {" OR ".join(conditions)}' if conditions else ''
+        rows = conn.execute(f'SELECT {quoted} FROM jackpot_series{where} ORDER BY "DrawDate"', params).fetchall()
+    finally:
+        conn.close()
+
+    keys = ['date', 'draw_num', 'jackpot', 'wins', 'rollover', 'streak', 'max_streak', 'reset', 'growth'] + \
+        [f'rolling_mean_{w}' for w in ROLLING_WINDOWS]
+    records = []
+    for row in rows:
+        record = dict(zip(keys, row))
+        record['rollover'] = bool(record['rollover'])
+        record['reset'] = bool(record['reset'])
+        records.append(record)
+    return records
+
+
+def mark_synced(db_path: str, dates: Sequence[str]):
+    """Clear the pending flag of rows that Supabase has accepted"""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executemany('UPDATE jackpot_series SET "Pending" = 0 WHERE "DrawDate" = ?', [(d,) for d in dates])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def pending_count(db_path: str = DEFAULT_DB_PATH) -> int:
+    """Rows recomputed since Supabase last accepted them"""
+    conn = sqlite3.connect(db_path)
+    try:
+        _ensure_table(conn)
+        return conn.execute('SELECT COUNT(*) FROM jackpot_series WHERE "Pending" = 1').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def latest_summary(db_path: str = DEFAULT_DB_PATH) -> Optional[Dict[str, Any]]:
+    """Most recent materialized row plus the average published jackpot, for the HTML report"""
+    conn = sqlite3.connect(db_path)
+    try:
+        _ensure_table(conn)
+        quoted = ', '.join(f'"{c}"' for c in SERIES_COLUMNS)
+        row = conn.execute(f'SELECT {quoted} FROM jackpot_series ORDER BY "DrawDate" DESC LIMIT 1').fetchone()
+        average = conn.execute('SELECT AVG("Jackpot") FROM jackpot_series').fetchone()[0]
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    summary = dict(zip(SERIES_COLUMNS, row))
+    summary['AverageJackpot'] = average or 0.0
+    return summary
+
+
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_PATH
+    written = materialize(db_path)
+    print(f"[*] Materialized {written} jackpot_series rows")
+    print(f"[*] Latest : {latest_summary(db_path)}")
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Offline micro-benchmarks for the pipeline's hot functions, with a stored baseline.
+
+Each target runs on synthetic draws at several sizes (1k, 100k and 1M by default). Like
+timeit's autorange, calls are grouped into samples of at least SAMPLE_SECONDS and the
+fastest per-call time over MIN_SECONDS of samples is recorded, so sub-millisecond targets
+are averaged over many calls instead of timed one call at a time. Results are compared with
+benchmark_baseline.json and the run exits with status 1 when a target is slower than its
+baseline by more than the threshold. Baselines also store a pure-Python calibration time,
+and comparisons are scaled by it, so a baseline recorded on a faster or slower machine
+still gives a fair gate. Shared machines slow down in bursts of a second or more, so the
+calibration is the fastest of several taken across the run, and a target that looks
+regressed is measured again before the run fails.
+
+    python micro_benchmarks.py --save-baseline        # record (or update) the baseline
+    python micro_benchmarks.py                        # compare, exit 1 on regression
+    python micro_benchmarks.py --sizes 1000 --only clean_jp transform_data
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+from datetime import date, timedelta
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from migrate_to_supabase import SupabaseMigrator
+from scraper import Base, CashpotGame, add_lotto_data_to_db, clean_jp, extract_month_rows, frequency_analysis
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+DEFAULT_THRESHOLD = 0.25
+
+# Calls are repeated until a sample lasts SAMPLE_SECONDS; samples are taken until MIN_SECONDS have been timed
+SAMPLE_SECONDS = 0.05
+MIN_SECONDS = 1.0
+
+# Times a regressed target is re-measured (keeping its fastest result) before it fails the run
+CONFIRM_ROUNDS = 2
+
+MONTH_ABBR = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def synthetic_scraped(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """n scraper records (WebScraper.ParsedData layout) on consecutive days from 1900-01-01"""
+    rng = random.Random(seed)
+    start = date(1900, 1, 1)
+    records = []
+    for i in range(n):
+        balls = sorted(rng.sample(range(1, 26), 5))
+        records.append({
+            'Date': (start + timedelta(days=i)).isoformat(),
+            'Draw#': i + 1,
+            'Numbers': '|'.join(str(b) for b in balls),
+            'Multiplier': rng.randint(1, 5),
+            'Jackpot': round(rng.uniform(10_000, 5_000_000), 2),
+            'Wins': rng.choice([-1, 0, 0, 0, 1]),
+            'Power Ball': 1,
+        })
+    return records
+
+
+def lotto_data_rows(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The same draws as lotto_data rows (SupabaseMigrator.get_sqlite_data layout)"""
+    return [
+        {
+            'DrawDate': r['Date'], 'DrawNum': str(r['Draw#']), 'Numbers': r['Numbers'],
+            'Power_Ball': str(r['Power Ball']), 'Multiplier': str(r['Multiplier']), 'Jackpot': str(r['Jackpot']),
+            'Wins': str(r['Wins']), 'uniqueId': f'{i:012x}', 'last_updated': r['Date'], 'date_created': r['Date'],
+        }
+        for i, r in enumerate(records)
+    ]
+
+
+def results_page(records: List[Dict[str, Any]]) -> str:
+    """A results page in the NLCB month-table layout holding every record"""
+    rows = []
+    for r in records:
+        year, month, day = r['Date'].split('-')
+        rows.append(
+            f'<tr class="lotto-date-tr"><td colspan="5"><strong>{day}-{MONTH_ABBR[int(month) - 1]}-{year[2:]}</strong></td></tr>'
+            f'<tr class="lotto-tr"><td>{r["Draw#"]}</td><td>{r["Numbers"]}</td><td>{r["Multiplier"]}</td>'
+            f'<td>${r["Jackpot"]:,.2f}</td><td>{r["Wins"]}</td></tr>'
+        )
+    return f'<html><body><table id="monthResults">{"".join(rows)}</table></body></html>'
+
+
+# Each target: setup(fixtures) -> (prepare, function); prepare() returns the arguments for one timed call
+Target = Callable[['Fixtures'], Tuple[Callable[[], tuple], Callable]]
+
+
+class Fixtures:
+    """Synthetic inputs for one size, built on first use and shared by the targets"""
+
+    def __init__(self, n: int, workdir: str):
+        self.n = n
+        self.workdir = workdir
+        self._cache = {}
+
+    def get(self, name: str, build: Callable[[], Any]) -> Any:
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        return self.get('records', lambda: synthetic_scraped(self.n))
+
+    @property
+    def rows(self) -> List[Dict[str, Any]]:
+        return self.get('rows', lambda: lotto_data_rows(self.records))
+
+    @property
+    def db_path(self) -> str:
+        def build():
+            path = os.path.join(self.workdir, f'lotto_{self.n}.db')
+            Base.metadata.create_all(create_engine(f'sqlite:///{path}'))
+            conn = sqlite3.connect(path)
+            columns = list(self.rows[0])
+            conn.executemany(
+                f"INSERT INTO lotto_data ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                [tuple(row[c] for c in columns) for row in self.rows]
+            )
+            conn.commit()
+            conn.close()
+            return path
+        return self.get('db_path', build)
+
+
+def _clean_jp(f: Fixtures):
+    jackpots = f.get('jackpot_strings', lambda: [f'${r["Jackpot"]:,.2f}' for r in f.records])
+    return (lambda: (jackpots,)), (lambda values: [clean_jp(v) for v in values])
+
+
+def _extract_month_rows(f: Fixtures):
+    page = f.get('page', lambda: results_page(f.records))
+    return (lambda: (page, CashpotGame.columns)), extract_month_rows
+
+
+def _add_lotto_data_to_db(f: Fixtures):
+    def prepare():
+        # A fresh in-memory database each time, so every record is a new insert
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(engine)
+        return sessionmaker(bind=engine)(), f.records
+    return prepare, add_lotto_data_to_db
+
+
+def _transform_data(f: Fixtures):
+    migrator = SupabaseMigrator('http://127.0.0.1', 'benchmark')
+    return (lambda: (f.rows,)), migrator.transform_data
+
+
+def _transform_scraped_data(f: Fixtures):
+    migrator = SupabaseMigrator('http://127.0.0.1', 'benchmark')
+    return (lambda: (f.records,)), migrator.transform_scraped_data
+
+
+def _get_sqlite_data(f: Fixtures):
+    migrator = SupabaseMigrator('http://127.0.0.1', 'benchmark')
+    return (lambda: (f.db_path,)), migrator.get_sqlite_data
+
+
+def _frequency_analysis(f: Fixtures):
+    return (lambda: (f.records,)), frequency_analysis
+
+
+# name -> (setup, largest size it runs at or None for no limit)
+TARGETS: Dict[str, Tuple[Target, Optional[int]]] = {
+    'clean_jp': (_clean_jp, None),
+    # bs4 parsing takes minutes at 1M rows; per-row ORM inserts cost about 1 ms each
+    'extract_month_rows': (_extract_month_rows, 100_000),
+    'add_lotto_data_to_db': (_add_lotto_data_to_db, 10_000),
+    'transform_data': (_transform_data, None),
+    'transform_scraped_data': (_transform_scraped_data, None),
+    'get_sqlite_data': (_get_sqlite_data, None),
+    'frequency_analysis': (_frequency_analysis, None),
+}
+
+
+def measure(prepare: Callable[[], tuple], function: Callable) -> float:
+    """Seconds per call: the fastest sample's mean, with samples taken until MIN_SECONDS have been timed"""
+    best = float('inf')
+    spent = 0.0
+    while spent < MIN_SECONDS:
+        sample = 0.0
+        calls = 0
+        while sample < SAMPLE_SECONDS:
+            args = prepare()
+            # As in timeit, the cyclic collector is paused while the call is timed
+            gc_was_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = perf_counter()
+                    function(*args)
+                    sample += perf_counter() - start
+            finally:
+                if gc_was_enabled:
+                    gc.enable()
+            calls += 1
+        best = min(best, sample / calls)
+        spent += sample
+    return best
+
+
+def calibrate() -> float:
+    """Time of a fixed pure-Python workload, used to compare results across machines"""
+    values = [f'${i * 1.37:,.2f}' for i in range(200_000)]
+
+    def work(values):
+        return sum(float(v.replace('$', '').replace(',', '')) for v in values)
+    return measure(lambda: (values,), work)
+
+
+def run(sizes, only=None) -> Dict[str, float]:
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in sizes:
+            fixtures = Fixtures(n, workdir)
+            for name, (setup, max_size) in TARGETS.items():
+                if only and name not in only:
+                    continue
+                if max_size is not None and n > max_size:
+                    continue
+                prepare, function = setup(fixtures)
+                seconds = measure(prepare, function)
+                results[f'{name}@{n}'] = seconds
+                print(f"{name:<24} {n:>9,} {seconds * 1e3:>11.2f} ms {seconds / n * 1e9:>10,.0f} ns/draw", flush=True)
+    return results
+
+
+def regressed(results: Dict[str, float], baseline: Dict[str, Any], calibration: float,
+              threshold: float) -> List[str]:
+    """Keys whose result is slower than the calibration-scaled baseline by more than the threshold"""
+    scale = calibration / baseline['calibration_seconds']
+    return [
+        key for key, seconds in results.items()
+        if key in baseline['results'] and seconds / (baseline['results'][key] * scale) - 1 > threshold
+    ]
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, Any], calibration: float,
+            threshold: float) -> List[str]:
+    """Print each result against the baseline; returns the keys that regressed past the threshold"""
+    scale = calibration / baseline['calibration_seconds']
+    regressions = regressed(results, baseline, calibration, threshold)
+    print(f"\nBaseline comparison (machine speed factor {scale:.2f}, threshold +{threshold:.0%})")
+    print(f"{'benchmark':<34} {'baseline ms':>12} {'now ms':>10} {'change':>8}")
+    for key, seconds in results.items():
+        base = baseline['results'].get(key)
+        if base is None:
+            print(f"{key:<34} {'-':>12} {seconds * 1e3:>10.2f} {'new':>8}")
+            continue
+        expected = base * scale
+        flag = '  REGRESSION' if key in regressions else ''
+        print(f"{key:<34} {expected * 1e3:>12.2f} {seconds * 1e3:>10.2f} {seconds / expected - 1:>+8.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmarks for the scraper and sync hot paths')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--only', nargs='+', choices=list(TARGETS), help='run only these targets')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed slowdown against the baseline, 0.25 = 25%%')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    args = parser.parse_args()
+
+    calibration = calibrate()
+    print(f"[*] Calibration {calibration * 1e3:.1f} ms")
+    print(f"{'benchmark':<24} {'draws':>9} {'time':>14} {'per draw':>15}")
+    results = run(args.sizes, args.only)
+    calibration = min(calibration, calibrate())
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    if args.save_baseline:
+        # Keep entries this run did not measure; rescale them to the new calibration
+        merged = {}
+        if baseline:
+            factor = calibration / baseline['calibration_seconds']
+            merged = {key: seconds * factor for key, seconds in baseline['results'].items()}
+        merged.update(results)
+        with open(args.baseline, 'w') as file:
+            json.dump({
+                'calibration_seconds': calibration,
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': merged,
+            }, file, indent=2, sort_keys=True)
+        print(f"\n[*] Baseline saved to {args.baseline}")
+        return
+
+    if baseline is None:
+        print(f"\n[*] No baseline at {args.baseline} - run with --save-baseline to record one")
+        return
+    for _ in range(CONFIRM_ROUNDS):
+        suspects = regressed(results, baseline, calibration, args.threshold)
+        if not suspects:
+            break
+        print(f"\n[*] Re-measuring {', '.join(suspects)} to rule out a noisy sample")
+        for key in suspects:
+            name, n = key.split('@')
+            results[key] = min(results[key], run([int(n)], [name])[key])
+        calibration = min(calibration, calibrate())
+    regressions = compare(results, baseline, calibration, args.threshold)
+    if regressions:
+        print(f"\n[*] {len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\n[*] No regressions")
+
+
+if __name__ == "__main__":
+    main()
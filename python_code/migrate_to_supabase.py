@@ -8,10 +8,29 @@ import os
 import sqlite3
 import requests
 import json
-from datetime import datetime
-from typing import List, Dict, Any
+import gzip
+import hashlib
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timedelta
+from typing import List, Dict, Any, Tuple
+from uuid import uuid4
 import sys
 
+# Import jackpot time-series materialization (optional, requires numpy)
+try:
+    from jackpot_series import materialize as materialize_jackpot_series, read_series as read_jackpot_series, \
+        mark_synced as mark_jackpot_series_synced
+    JACKPOT_SERIES_AVAILABLE = True
+except ImportError:
+    JACKPOT_SERIES_AVAILABLE = False
+
+import sync_outbox
+from resilience import (Backoff, CircuitBreaker, CircuitOpenError, Counters, Deadline, DeadlineExceeded,
+                        RETRYABLE_STATUSES)
+
 # Add the parent directory to the path to access .env
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -44,19 +63,18 @@ def load_env():
     sys.exit(1)
 
 
-def update_supabase_with_new_data(scraped_data: List[Dict[str, Any]]) -> int:
+def sync_changes_to_supabase(db_path: str) -> int:
     """
-    Update Supabase with new data from the scraper.
+    Push the changes recorded in the SQLite outbox to Supabase, then the recomputed jackpot_series rows.
     This function is designed to be imported and used by the scraper.
     
     Args:
-        scraped_data: List of dictionaries containing scraped lottery data
+        db_path: SQLite database; the sync_outbox triggers are installed on the first call
         
     Returns:
-        int: Number of new records added to Supabase
+        int: Number of draws upserted or deleted in Supabase
     """
     try:
-        # Load environment variables
         env_vars = load_env()
         
         supabase_url = env_vars.get('EXPO_PUBLIC_SUPABASE_URL')
@@ -66,62 +84,52 @@ def update_supabase_with_new_data(scraped_data: List[Dict[str, Any]]) -> int:
             print("❌ Missing required environment variables for Supabase update")
             return 0
         
-        # Initialize migrator
         migrator = SupabaseMigrator(supabase_url, supabase_key)
-        
-        # Test connection
-        if not migrator.test_connection():
-            print("❌ Failed to connect to Supabase")
-            return 0
-        
-        # Check if table exists
-        if not migrator.check_table_exists():
-            print("❌ Table 'lotto_results' does not exist in Supabase")
-            return 0
-        
-        # Get latest date from Supabase to determine what's new
-        latest_date = migrator.get_latest_date_in_supabase()
-        
-        # Transform scraped data to match Supabase schema
-        transformed_data = migrator.transform_scraped_data(scraped_data)
-        
-        if not transformed_data:
-            print("❌ No valid data after transformation")
-            return 0
-        
-        # Filter out data that already exists in Supabase
-        if latest_date:
-            # Only keep records newer than the latest date in Supabase
-            filtered_data = []
-            for record in transformed_data:
-                if record['date'] > latest_date:
-                    filtered_data.append(record)
-            
-            if not filtered_data:
-                print("✅ No new data to add - Supabase is already up to date")
-                return 0
-            
-            print(f"📥 Found {len(filtered_data)} new records to add to Supabase")
-            transformed_data = filtered_data
-        else:
-            print(f"📥 No existing data in Supabase - adding all {len(transformed_data)} records")
-        
-        # Upload new data to Supabase
-        success = migrator.upload_to_supabase(transformed_data)
-        
-        if success:
-            print(f"✅ Successfully added {len(transformed_data)} new records to Supabase")
-            return len(transformed_data)
-        else:
-            print("❌ Failed to upload data to Supabase")
-            return 0
-            
+        if not sync_outbox.is_installed(db_path):
+            # First sync: from now on the triggers record changes; what Supabase lacks is queued
+            sync_outbox.install(db_path, since=migrator.get_latest_date_in_supabase())
+            print("✅ Installed sync outbox triggers")
+        synced = migrator.drain_outbox(db_path)
+        migrator.sync_jackpot_series(db_path)
+        print(f"📡 Request outcomes: {migrator.counters.summary()}")
+        return synced
+    
     except Exception as e:
-        print(f"❌ Error updating Supabase: {e}")
+        print(f"❌ Error syncing outbox to Supabase: {e}")
         return 0
 
+# Field order of the CSV payload, and RPC argument name -> record field for the columnar payload
+UPLOAD_COLUMNS = ['date', 'draw_num', 'numbers', 'power_ball', 'multiplier', 'jackpot', 'wins']
+RPC_ARGUMENTS = {
+    'dates': 'date',
+    'draw_nums': 'draw_num',
+    'numbers': 'numbers',
+    'power_balls': 'power_ball',
+    'multipliers': 'multiplier',
+    'jackpots': 'jackpot',
+    'wins': 'wins',
+}
+
+# Batch size bounds and per-request duration that auto-tuned uploads aim for
+MIN_BATCH_SIZE = 50
+MAX_BATCH_SIZE = 5000
+TARGET_BATCH_SECONDS = 2.0
+
+def _text(value: Any) -> str | None:
+    """lotto_data stores numbers as text; NULL stays NULL instead of becoming 'None'"""
+    return None if value is None else str(value)
+
+def tune_batch_size(batch_size: int, elapsed: float) -> int:
+    """Rescale a batch size towards TARGET_BATCH_SECONDS of upload time, at most 2x either way"""
+    scale = min(max(TARGET_BATCH_SECONDS / max(elapsed, 1e-3), 0.5), 2.0)
+    return int(min(max(batch_size * scale, MIN_BATCH_SIZE), MAX_BATCH_SIZE))
+
+# Per-request timeout, and the deadline that bounds one sync or restore run
+REQUEST_TIMEOUT = 30
+RUN_DEADLINE = float(os.environ.get('SUPABASE_RUN_DEADLINE', 900))
+
 class SupabaseMigrator:
-    def __init__(self, supabase_url: str, supabase_key: str):
+    def __init__(self, supabase_url: str, supabase_key: str, run_deadline: float | None = RUN_DEADLINE):
         self.supabase_url = supabase_url.rstrip('/')
         self.supabase_key = supabase_key
         self.headers = {
@@ -130,13 +138,63 @@ class SupabaseMigrator:
             'Content-Type': 'application/json',
             'Prefer': 'return=minimal'
         }
+        self.last_upload_stats = {}
+        self.run_deadline = run_deadline
+        self.backoff = Backoff(attempts=3, base_delay=1.0, max_delay=10.0)
+        self.counters = Counters()
+        self.start_run()
+    
+    def start_run(self):
+        """Start the run deadline and close the circuit breaker (called again after interactive prompts)"""
+        self.deadline = Deadline(self.run_deadline)
+        self.breaker = CircuitBreaker('supabase', failure_threshold=5, reset_timeout=60)
+    
+    def _request(self, method: str, url: str, retry: bool = True, timeout: float = REQUEST_TIMEOUT,
+                 **kwargs) -> requests.Response:
+        """
+        requests.request bounded by the run deadline and guarded by the circuit breaker.
+        Timeouts, connection errors and RETRYABLE_STATUSES are retried with jittered backoff
+        when `retry` is set (leave it off for requests that are not safe to replay). Raises
+        CircuitOpenError or DeadlineExceeded instead of sending once either limit is hit.
+        """
+        attempts = self.backoff.attempts if retry else 1
+        for attempt in range(1, attempts + 1):
+            with self.counters.stops():
+                self.breaker.check()
+                request_timeout = self.deadline.timeout(timeout)
+            self.counters.add('requests')
+            response = None
+            try:
+                response = requests.request(method, url, timeout=request_timeout, **kwargs)
+            except requests.exceptions.Timeout as e:
+                self.counters.add('timeouts')
+                error = e
+            except requests.exceptions.ConnectionError as e:
+                self.counters.add('connection_errors')
+                error = e
+            else:
+                if response.status_code not in RETRYABLE_STATUSES:
+                    self.breaker.record_success()
+                    self.counters.add('responses')
+                    return response
+                self.counters.add('server_errors')
+            
+            self.breaker.record_failure()
+            if attempt == attempts:
+                if response is not None:
+                    return response
+                raise error
+            with self.counters.stops():
+                delay = self.backoff.delay_within(attempt, self.deadline)
+            self.counters.add('retries')
+            time.sleep(delay)
     
     def test_connection(self) -> bool:
         """Test the Supabase connection"""
         try:
             # Test basic connectivity
-            response = requests.get(
-                f"{self.supabase_url}/rest/v1/",
+            response = self._request(
+                'GET', f"{self.supabase_url}/rest/v1/",
                 headers=self.headers,
                 timeout=10
             )
@@ -171,8 +229,8 @@ class SupabaseMigrator:
         print("📋 Checking if lotto_results table exists...")
         
         try:
-            response = requests.get(
-                f"{self.supabase_url}/rest/v1/lotto_results?select=draw_num&limit=1",
+            response = self._request(
+                'GET', f"{self.supabase_url}/rest/v1/lotto_results?select=draw_num&limit=1",
                 headers=self.headers,
                 timeout=10
             )
@@ -198,8 +256,8 @@ class SupabaseMigrator:
         print("🔍 Checking latest date in Supabase...")
         
         try:
-            response = requests.get(
-                f"{self.supabase_url}/rest/v1/lotto_results?select=date&order=date.desc&limit=1",
+            response = self._request(
+                'GET', f"{self.supabase_url}/rest/v1/lotto_results?select=date&order=date.desc&limit=1",
                 headers=self.headers,
                 timeout=10
             )
@@ -392,53 +450,450 @@ class SupabaseMigrator:
         print(f"🔄 Transformed {len(transformed)} valid records")
         return transformed
     
-    def upload_to_supabase(self, data: List[Dict[str, Any]]) -> bool:
-        """Upload data to Supabase in batches"""
+    def encode_batch(self, batch: List[Dict[str, Any]], payload_format: str = 'json',
+                     compress: bool = False, upsert: bool = False) -> Tuple[str, Dict[str, str], bytes]:
+        """
+        Request path, headers and body for one upload batch in the given payload format.
+        csv and columnar always upsert on date; json only inserts unless `upsert` is set.
+        """
+        headers = dict(self.headers)
+        if payload_format == 'json':
+            # One object per record, every key repeated per row
+            path = "/rest/v1/lotto_results"
+            if upsert:
+                path += "?on_conflict=date"
+                headers['Prefer'] = 'resolution=merge-duplicates,return=minimal'
+            body = json.dumps(batch, separators=(',', ':')).encode('utf-8')
+        elif payload_format == 'csv':
+            # PostgREST bulk-inserts CSV directly; keys appear once in the header line
+            path = "/rest/v1/lotto_results?on_conflict=date"
+            headers['Content-Type'] = 'text/csv'
+            headers['Prefer'] = 'resolution=merge-duplicates,return=minimal'
+            lines = [','.join(UPLOAD_COLUMNS)]
+            for r in batch:
+                lines.append(f"{r['date']},{r['draw_num']},{r['numbers']},{r['power_ball']},"
+                             f"{r['multiplier']},{r['jackpot']},{r['wins']}")
+            body = '\n'.join(lines).encode('utf-8')
+        elif payload_format == 'columnar':
+            # One array per column, unnested server-side by bulk_upsert_lotto_results (sql_in_supabase.sql)
+            path = "/rest/v1/rpc/bulk_upsert_lotto_results"
+            columns = {name: [r[column] for r in batch] for name, column in RPC_ARGUMENTS.items()}
+            body = json.dumps(columns, separators=(',', ':')).encode('utf-8')
+        else:
+            raise ValueError(f"Unknown payload format: {payload_format}")
+        
+        if compress:
+            headers['Content-Encoding'] = 'gzip'
+            body = gzip.compress(body, compresslevel=6)
+        return path, headers, body
+    
+    def upload_to_supabase(self, data: List[Dict[str, Any]], payload_format: str = 'json',
+                           compress: bool = False, batch_size: int = 100, auto_tune: bool = False) -> bool:
+        """
+        Upload data to Supabase in batches.
+        payload_format is 'json' (one object per row), 'csv' or 'columnar' (arrays through the
+        bulk_upsert_lotto_results RPC); compress gzips each body. With auto_tune the batch size
+        is rescaled after every batch towards TARGET_BATCH_SECONDS of upload time.
+        """
         if not data:
             print("❌ No data to upload")
             return False
         
-        batch_size = 100
-        total_batches = (len(data) + batch_size - 1) // batch_size
-        
-        print(f"📤 Uploading {len(data)} records in {total_batches} batches...")
+        mode = payload_format + (' + gzip' if compress else '') + (', auto batch size' if auto_tune else '')
+        print(f"📤 Uploading {len(data)} records ({mode})...")
         
         success_count = 0
         error_count = 0
+        bytes_sent = 0
+        batch_num = 0
+        started = datetime.now()
+        i = 0
         
-        for i in range(0, len(data), batch_size):
+        while i < len(data):
             batch = data[i:i + batch_size]
-            batch_num = (i // batch_size) + 1
+            i += len(batch)
+            batch_num += 1
             
-            print(f"📦 Processing batch {batch_num}/{total_batches} ({len(batch)} records)...")
+            print(f"📦 Processing batch {batch_num} ({len(batch)} records)...")
             
             try:
-                response = requests.post(
-                    f"{self.supabase_url}/rest/v1/lotto_results",
-                    headers=self.headers,
-                    json=batch
+                path, headers, body = self.encode_batch(batch, payload_format, compress)
+                batch_started = datetime.now()
+                # Plain JSON inserts are not idempotent, so a timed-out batch is not replayed
+                response = self._request(
+                    'POST', f"{self.supabase_url}{path}",
+                    retry=payload_format != 'json',
+                    headers=headers,
+                    data=body,
+                    timeout=60
                 )
+                elapsed = (datetime.now() - batch_started).total_seconds()
+                bytes_sent += len(body)
                 
-                if response.status_code == 201:
+                if response.status_code in (200, 201, 204):
                     success_count += len(batch)
-                    print(f"✅ Batch {batch_num} uploaded successfully")
+                    print(f"✅ Batch {batch_num} uploaded successfully ({len(body):,} bytes, {elapsed:.2f}s)")
+                    if auto_tune:
+                        batch_size = tune_batch_size(batch_size, elapsed)
                 else:
                     error_count += len(batch)
                     print(f"❌ Batch {batch_num} failed: {response.status_code}")
                     print(f"Response: {response.text}")
+                    if auto_tune:
+                        batch_size = max(batch_size // 2, MIN_BATCH_SIZE)
                     
+            except (CircuitOpenError, DeadlineExceeded) as e:
+                error_count += len(data) - i + len(batch)
+                print(f"❌ Stopping upload at batch {batch_num}: {e}")
+                break
             except Exception as e:
                 error_count += len(batch)
                 print(f"❌ Batch {batch_num} error: {e}")
+                if auto_tune:
+                    batch_size = max(batch_size // 2, MIN_BATCH_SIZE)
+        
+        seconds = (datetime.now() - started).total_seconds()
+        self.last_upload_stats = {
+            'records': success_count,
+            'failed': error_count,
+            'batches': batch_num,
+            'bytes_sent': bytes_sent,
+            'seconds': seconds,
+            'records_per_second': success_count / seconds if seconds > 0 else 0.0,
+        }
         
         print(f"\n📊 Upload Summary:")
         print(f"✅ Successful: {success_count}")
         print(f"❌ Failed: {error_count}")
         print(f"📈 Success Rate: {(success_count / len(data)) * 100:.1f}%")
+        print(f"📶 Sent {bytes_sent:,} bytes in {batch_num} batches ({self.last_upload_stats['records_per_second']:,.0f} records/s)")
         
         return error_count == 0
     
 
+    def upsert_to_supabase(self, data: List[Dict[str, Any]], payload_format: str = 'json',
+                           compress: bool = False) -> bool:
+        """Insert or update records keyed on date (replaying the same records is harmless)"""
+        try:
+            path, headers, body = self.encode_batch(data, payload_format, compress, upsert=True)
+            response = self._request(
+                'POST', f"{self.supabase_url}{path}",
+                headers=headers,
+                data=body,
+                timeout=60
+            )
+            if response.status_code in (200, 201, 204):
+                return True
+            print(f"❌ Upsert failed: {response.status_code}")
+            print(f"Response: {response.text}")
+            return False
+        except Exception as e:
+            print(f"❌ Upsert error: {e}")
+            return False
+    
+    def delete_dates_from_supabase(self, dates: List[str]) -> bool:
+        """Delete the draws on the given dates"""
+        try:
+            response = self._request(
+                'DELETE', f"{self.supabase_url}/rest/v1/lotto_results?date=in.({','.join(dates)})",
+                headers=self.headers,
+                timeout=30
+            )
+            if response.status_code in (200, 204):
+                return True
+            print(f"❌ Delete failed: {response.status_code}")
+            print(f"Response: {response.text}")
+            return False
+        except Exception as e:
+            print(f"❌ Delete error: {e}")
+            return False
+    
+    def drain_outbox(self, db_path: str, payload_format: str = 'json', compress: bool = False,
+                     batch_size: int = 500, auto_tune: bool = False) -> int:
+        """
+        Drain the SQLite outbox in batches, acknowledging each batch only after Supabase accepted it.
+        Upserts are sent in `payload_format` (see upload_to_supabase); with auto_tune the number of
+        outbox entries per batch is rescaled towards TARGET_BATCH_SECONDS per upsert.
+        """
+        pending = sync_outbox.pending_count(db_path)
+        if not pending:
+            print("✅ No pending changes - Supabase is already up to date")
+            return 0
+        
+        mode = payload_format + (' + gzip' if compress else '') + (', auto batch size' if auto_tune else '')
+        print(f"📤 Syncing {pending} pending changes from the outbox ({mode})...")
+        synced = 0
+        while True:
+            last_id, rows, delete_dates = sync_outbox.read_batch(db_path, batch_size)
+            if not last_id:
+                break
+            
+            if rows:
+                records = self.transform_data(rows)
+                started = time.perf_counter()
+                if records and not self.upsert_to_supabase(records, payload_format, compress):
+                    print("⚠️  Stopping sync - the failed batch stays in the outbox for the next run")
+                    break
+                if auto_tune and records:
+                    batch_size = tune_batch_size(batch_size, time.perf_counter() - started)
+                synced += len(records)
+            if delete_dates:
+                if not self.delete_dates_from_supabase(delete_dates):
+                    print("⚠️  Stopping sync - the failed batch stays in the outbox for the next run")
+                    break
+                synced += len(delete_dates)
+            
+            sync_outbox.acknowledge(db_path, last_id)
+        
+        print(f"✅ Synced {synced} changed draws, {sync_outbox.pending_count(db_path)} changes still pending")
+        return synced
+    
+    def sync_jackpot_series(self, db_path: str) -> int:
+        """Upsert jackpot_series rows that were recomputed locally, or that Supabase does not have yet"""
+        if not JACKPOT_SERIES_AVAILABLE:
+            print("⚠️  Jackpot series sync skipped - jackpot_series.py or numpy not available")
+            return 0
+        
+        materialize_jackpot_series(db_path)
+        
+        latest_date = None
+        try:
+            response = self._request(
+                'GET', f"{self.supabase_url}/rest/v1/jackpot_series?select=date&order=date.desc&limit=1",
+                headers=self.headers,
+                timeout=10
+            )
+            if response.status_code == 200 and response.json():
+                latest_date = response.json()[0]['date']
+            elif response.status_code != 200:
+                print(f"⚠️  Could not read jackpot_series: {response.status_code}")
+                return 0
+        except Exception as e:
+            print(f"⚠️  Error checking jackpot_series: {e}")
+            return 0
+        
+        records = read_jackpot_series(db_path, since=latest_date, pending=True)
+        if not records:
+            print("✅ jackpot_series is already up to date")
+            return 0
+        
+        print(f"📈 Syncing {len(records)} jackpot_series rows...")
+        headers = dict(self.headers)
+        headers['Prefer'] = 'resolution=merge-duplicates,return=minimal'
+        synced = 0
+        batch_size = 500
+        for i in range(0, len(records), batch_size):
+            batch = records[i:i + batch_size]
+            try:
+                response = self._request(
+                    'POST', f"{self.supabase_url}/rest/v1/jackpot_series?on_conflict=date",
+                    headers=headers,
+                    json=batch,
+                    timeout=30
+                )
+                if response.status_code in (200, 201):
+                    mark_jackpot_series_synced(db_path, [record['date'] for record in batch])
+                    synced += len(batch)
+                else:
+                    print(f"❌ jackpot_series batch failed: {response.status_code}")
+                    print(f"Response: {response.text}")
+                    break
+            except Exception as e:
+                print(f"❌ jackpot_series batch error: {e}")
+                break
+        
+        print(f"✅ Synced {synced} jackpot_series rows")
+        return synced
+    
+    def count_supabase_rows(self, date_filter: str | None = None) -> int:
+        """Exact row count of lotto_results, optionally within a PostgREST `and=(...)` date filter"""
+        headers = dict(self.headers)
+        headers['Prefer'] = 'count=exact'
+        params = {'select': 'date'}
+        if date_filter:
+            params['and'] = date_filter
+        response = self._request(
+            'HEAD', f"{self.supabase_url}/rest/v1/lotto_results",
+            headers=headers,
+            params=params,
+            timeout=30
+        )
+        if response.status_code not in (200, 206):
+            raise RuntimeError(f"Count failed: {response.status_code}")
+        return int(response.headers.get('Content-Range', '*/0').split('/')[-1])
+    
+    def get_date_bounds_in_supabase(self) -> Tuple[str, str] | None:
+        """Earliest and latest draw dates in Supabase"""
+        bounds = []
+        for order in ('asc', 'desc'):
+            response = self._request(
+                'GET', f"{self.supabase_url}/rest/v1/lotto_results?select=date&order=date.{order}&limit=1",
+                headers=self.headers,
+                timeout=10
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"Could not read date bounds: {response.status_code}")
+            data = response.json()
+            if not data:
+                return None
+            bounds.append(data[0]['date'])
+        return bounds[0], bounds[1]
+    
+    def _download_partition(self, start: str, end: str, page_size: int, pages: queue.Queue) -> int:
+        """Keyset-paginate draws with start <= date < end, handing each page to the writer"""
+        columns = 'date,draw_num,numbers,power_ball,multiplier,jackpot,wins'
+        downloaded = 0
+        lower = f'date.gte.{start}'
+        while True:
+            response = self._request(
+                'GET', f"{self.supabase_url}/rest/v1/lotto_results",
+                headers=self.headers,
+                params={
+                    'select': columns,
+                    'and': f'({lower},date.lt.{end})',
+                    'order': 'date.asc',
+                    'limit': page_size,
+                },
+                timeout=30
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"Page after {lower} failed: {response.status_code} {response.text}")
+            page = response.json()
+            # A short page is not the end: the server may cap pages below page_size (max-rows)
+            if not page:
+                return downloaded
+            pages.put(page)
+            downloaded += len(page)
+            lower = f"date.gt.{page[-1]['date']}"
+    
+    @staticmethod
+    def _record_checksum(records: List[Dict[str, Any]]) -> int:
+        """Order-independent checksum of draws in Supabase field names; NULL numbers count as 0"""
+        total = 0
+        for r in records:
+            canonical = (f"{r['date']}|{int(float(r['draw_num'] or 0))}|{r['numbers']}|{int(float(r['power_ball'] or 0))}|"
+                         f"{int(float(r['multiplier'] or 0))}|{float(r['jackpot'] or 0):.2f}|{int(float(r['wins'] or 0))}")
+            total = (total + int(hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16], 16)) % (1 << 64)
+        return total
+    
+    def restore_to_sqlite(self, db_path: str, partitions: int = 8, page_size: int = 1000) -> bool:
+        """Download every lotto_results row into the SQLite lotto_data table and verify counts and checksums"""
+        print("📥 Restoring lotto_results from Supabase into SQLite...")
+        bounds = self.get_date_bounds_in_supabase()
+        if not bounds:
+            print("❌ Supabase has no data to restore")
+            return False
+        
+        # Split the date range into equal spans, one keyset-paginated download per span
+        first = date.fromisoformat(bounds[0])
+        last = date.fromisoformat(bounds[1]) + timedelta(days=1)
+        span = max((last - first).days // partitions, 1)
+        edges = [first + timedelta(days=span * i) for i in range(partitions)] + [last]
+        ranges = [(a.isoformat(), b.isoformat()) for a, b in zip(edges, edges[1:]) if a < b]
+        print(f"📅 {bounds[0]} to {bounds[1]} in {len(ranges)} partitions")
+        
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS lotto_data ("DrawDate" DATE NOT NULL, "DrawNum" VARCHAR, "Numbers" VARCHAR, '
+            '"Power_Ball" VARCHAR, "Multiplier" VARCHAR, "Jackpot" VARCHAR, "Wins" VARCHAR, "uniqueId" VARCHAR, '
+            'last_updated DATE, date_created DATE, PRIMARY KEY ("DrawDate"))'
+        )
+        outbox_before = None
+        if sync_outbox.is_installed(db_path):
+            outbox_before = conn.execute("SELECT COALESCE(MAX(id), 0) FROM sync_outbox").fetchone()[0]
+        conn.execute("PRAGMA synchronous = OFF")
+        
+        pages: queue.Queue = queue.Queue(maxsize=64)
+        done = object()
+        downloaded_checksum = 0
+        restored_dates = []
+        written = 0
+        today = date.today().isoformat()
+        start_time = datetime.now()
+        
+        def download_all():
+            try:
+                with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                    futures = [executor.submit(self._download_partition, a, b, page_size, pages) for a, b in ranges]
+                    counts = [f.result() for f in futures]
+                pages.put((done, counts))
+            except Exception as e:
+                pages.put((done, e))
+        
+        downloader = threading.Thread(target=download_all, daemon=True)
+        downloader.start()
+        
+        # Stream pages straight into one SQLite transaction as they arrive
+        try:
+            while True:
+                page = pages.get()
+                if isinstance(page, tuple) and page[0] is done:
+                    result = page[1]
+                    break
+                downloaded_checksum = (downloaded_checksum + self._record_checksum(page)) % (1 << 64)
+                restored_dates.extend(r['date'] for r in page)
+                # Existing draws keep their uniqueId and date_created; only the draw columns are overwritten
+                conn.executemany(
+                    'INSERT INTO lotto_data VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT("DrawDate") DO UPDATE SET "DrawNum" = excluded."DrawNum", '
+                    '"Numbers" = excluded."Numbers", "Power_Ball" = excluded."Power_Ball", '
+                    '"Multiplier" = excluded."Multiplier", "Jackpot" = excluded."Jackpot", "Wins" = excluded."Wins"',
+                    [
+                        (r['date'], _text(r['draw_num']), r['numbers'], _text(r['power_ball']), _text(r['multiplier']),
+                         _text(r['jackpot']), _text(r['wins']), uuid4().hex[-12:], today, today)
+                        for r in page
+                    ]
+                )
+                written += len(page)
+            if isinstance(result, Exception):
+                conn.rollback()
+                print(f"❌ Restore failed, nothing was written: {result}")
+                return False
+            if outbox_before is not None:
+                # Rows that came from Supabase do not need to be pushed back
+                conn.execute("DELETE FROM sync_outbox WHERE id > ?", (outbox_before,))
+            conn.commit()
+        finally:
+            conn.close()
+        
+        elapsed = (datetime.now() - start_time).total_seconds()
+        print(f"💾 Wrote {written} rows in {elapsed:.1f}s ({written / max(elapsed, 1e-9):,.0f} rows/s)")
+        return self.verify_restore(db_path, ranges, result, downloaded_checksum, restored_dates)
+    
+    def verify_restore(self, db_path: str, ranges: List[Tuple[str, str]], downloaded: List[int], checksum: int,
+                       dates: List[str]) -> bool:
+        """
+        Compare per-partition counts with Supabase, and the checksum of the local rows for the
+        restored `dates` with what was downloaded; local draws Supabase does not have are ignored
+        """
+        ok = True
+        for (a, b), count in zip(ranges, downloaded):
+            remote = self.count_supabase_rows(f'(date.gte.{a},date.lt.{b})')
+            if remote != count:
+                print(f"❌ Partition {a}..{b}: Supabase has {remote} rows, downloaded {count}")
+                ok = False
+        
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute("CREATE TEMP TABLE restored_dates (date TEXT PRIMARY KEY)")
+            conn.executemany("INSERT OR IGNORE INTO restored_dates VALUES (?)", [(d,) for d in dates])
+            rows = conn.execute(
+                "SELECT DrawDate, DrawNum, Numbers, Power_Ball, Multiplier, Jackpot, Wins FROM lotto_data "
+                "JOIN restored_dates ON restored_dates.date = lotto_data.DrawDate"
+            ).fetchall()
+        finally:
+            conn.close()
+        local = self._record_checksum([
+            dict(zip(('date', 'draw_num', 'numbers', 'power_ball', 'multiplier', 'jackpot', 'wins'), row))
+            for row in rows
+        ])
+        if len(rows) != sum(downloaded) or local != checksum:
+            print(f"❌ Local copy does not match the download ({len(rows)} rows vs {sum(downloaded)})")
+            ok = False
+        
+        if ok:
+            print(f"✅ Restore verified: {sum(downloaded)} rows, checksum {checksum:016x}")
+        return ok
     
     def clear_existing_data(self) -> bool:
         """Clear existing data from Supabase table"""
@@ -446,9 +901,10 @@ class SupabaseMigrator:
         
         try:
             # Delete all records from the table - service role key allows this
-            response = requests.delete(
-                f"{self.supabase_url}/rest/v1/lotto_results",
-                headers=self.headers
+            response = self._request(
+                'DELETE', f"{self.supabase_url}/rest/v1/lotto_results",
+                headers=self.headers,
+                timeout=60
             )
             
             if response.status_code == 204:
@@ -463,10 +919,23 @@ class SupabaseMigrator:
             print(f"❌ Error clearing data: {e}")
             return False
 
+def parse_upload_options(argv: List[str]) -> Dict[str, Any]:
+    """Upload flags: --format json|csv|columnar, --gzip, --auto-batch"""
+    options = {'payload_format': 'json', 'compress': '--gzip' in argv, 'auto_tune': '--auto-batch' in argv}
+    if '--format' in argv and argv.index('--format') + 1 < len(argv):
+        options['payload_format'] = argv[argv.index('--format') + 1]
+    if options['payload_format'] not in ('json', 'csv', 'columnar'):
+        print(f"❌ Unknown upload format: {options['payload_format']}")
+        sys.exit(1)
+    return options
+
 def main():
     print("🚀 Starting SQLite to Supabase Smart Sync")
     print("=" * 50)
     
+    # Upload flags apply to every outbox drain, not just the first catch-up
+    upload_options = parse_upload_options(sys.argv[1:])
+    
     # Load environment variables
     env_vars = load_env()
     
@@ -496,9 +965,6 @@ def main():
         print("Please create the table first using the SQL in sql_in_supabase.sql")
         sys.exit(1)
     
-    # Get latest date from Supabase to determine what to sync
-    latest_date = migrator.get_latest_date_in_supabase()
-    
     # Get SQLite data
     db_path = os.path.join(os.path.dirname(__file__), 'database', 'Lotto_Results_Database(3).db')
     
@@ -506,55 +972,73 @@ def main():
         print(f"❌ SQLite database not found at: {db_path}")
         sys.exit(1)
     
-    # Get data from SQLite, filtered by latest date if available
-    data = migrator.get_sqlite_data(db_path, latest_date)
-    if not data:
+    # First run: install the outbox triggers, which also queue every row Supabase is missing,
+    # so the catch-up is just the first drain and a declined or failed run keeps them pending
+    if not sync_outbox.is_installed(db_path):
+        latest_date = migrator.get_latest_date_in_supabase()
+        queued = sync_outbox.install(db_path, since=latest_date)
+        print("✅ Installed sync outbox triggers - future runs will only push changed rows")
+        
         if latest_date:
-            print("✅ No new data to sync - Supabase is already up to date!")
-            sys.exit(0)
+            print(f"\n🔄 Sync Summary:")
+            print(f"   📅 Latest date in Supabase: {latest_date}")
+            print(f"   📥 New records to upload: {queued}")
+            print(f"   🎯 This will add new records without affecting existing data")
         else:
-            print("❌ No data found in SQLite database")
-            sys.exit(1)
+            print(f"\n🆕 Initial Upload Summary:")
+            print(f"   📥 Total records to upload: {queued}")
+            print(f"   🎯 This will create the initial dataset")
+        
+        if queued:
+            # Ask user to continue
+            response = input("\nDo you want to continue? (yes/no): ").lower().strip()
+            if response not in ['yes', 'y']:
+                print(f"❌ Sync cancelled by user - {queued} records stay queued for the next run")
+                sys.exit(0)
+            
+            # The deadline bounds the upload itself, not the time spent at the prompt
+            migrator.start_run()
     
-    # Transform data
-    transformed_data = migrator.transform_data(data)
-    if not transformed_data:
-        print("❌ No valid data after transformation")
+    migrator.drain_outbox(db_path, **upload_options)
+    # Keep the precomputed jackpot statistics in step with lotto_results
+    migrator.sync_jackpot_series(db_path)
+    print(f"📡 Request outcomes: {migrator.counters.summary()}")
+    if sync_outbox.pending_count(db_path):
+        print("\n⚠️  Sync completed with errors - unsent changes stay in the outbox for the next run")
+        print("Please check the logs above for details")
         sys.exit(1)
+    print("\n🎉 Sync completed successfully!")
+
+def restore_main():
+    """Provision a local SQLite database from Supabase: python migrate_to_supabase.py --restore [db_path]"""
+    print("🚀 Starting Supabase to SQLite restore")
+    print("=" * 50)
     
-    # Show sync summary
-    if latest_date:
-        print(f"\n🔄 Sync Summary:")
-        print(f"   📅 Latest date in Supabase: {latest_date}")
-        print(f"   📥 New records to upload: {len(transformed_data)}")
-        print(f"   🎯 This will add new records without affecting existing data")
-    else:
-        print(f"\n🆕 Initial Upload Summary:")
-        print(f"   📥 Total records to upload: {len(transformed_data)}")
-        print(f"   🎯 This will create the initial dataset")
+    env_vars = load_env()
+    supabase_url = env_vars.get('EXPO_PUBLIC_SUPABASE_URL')
+    supabase_key = env_vars.get('EXPO_PUBLIC_SUPABASE_ANON_KEY')
+    if not supabase_url or not supabase_key:
+        print("❌ Missing required environment variables:")
+        print("   EXPO_PUBLIC_SUPABASE_URL")
+        print("   EXPO_PUBLIC_SUPABASE_ANON_KEY")
+        sys.exit(1)
     
-    # Ask user to continue
-    response = input("\nDo you want to continue? (yes/no): ").lower().strip()
-    if response not in ['yes', 'y']:
-        print("❌ Sync cancelled by user")
-        sys.exit(0)
+    args = [a for a in sys.argv[1:] if a != '--restore']
+    db_path = args[0] if args else os.path.join(os.path.dirname(__file__), 'database', 'Lotto_Results_Database(3).db')
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
     
-    # Upload data (no need to clear existing data for incremental sync)
-    success = migrator.upload_to_supabase(transformed_data)
+    migrator = SupabaseMigrator(supabase_url, supabase_key)
+    if not migrator.test_connection() or not migrator.check_table_exists():
+        sys.exit(1)
     
-    if success:
-        if latest_date:
-            print("\n🎉 Sync completed successfully!")
-            print(f"📊 New records added: {len(transformed_data)}")
-            print(f"📅 Supabase now contains data up to the latest date")
-        else:
-            print("\n🎉 Initial upload completed successfully!")
-            print(f"📊 Total records uploaded: {len(transformed_data)}")
-            print(f"📅 Supabase now contains the complete dataset")
-    else:
-        print("\n⚠️  Sync completed with errors")
-        print("Please check the logs above for details")
+    restored = migrator.restore_to_sqlite(db_path)
+    print(f"📡 Request outcomes: {migrator.counters.summary()}")
+    if not restored:
         sys.exit(1)
+    print(f"\n🎉 Restore completed: {db_path}")
 
 if __name__ == "__main__":
-    main()
+    if '--restore' in sys.argv:
+        restore_main()
+    else:
+        main()
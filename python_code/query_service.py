@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Optional read-only HTTP service over the local Cashpot SQLite database.
+
+Serves the latest draw, paginated history and frequency statistics so app installs do not
+have to query Supabase for data this machine already holds. Response bodies are kept in an
+in-memory LRU cache together with their ETag and a gzip copy; matching If-None-Match
+requests get a 304. The cache is dropped whenever lotto_data changes, detected through
+SQLite's data_version, which moves on every commit made by any other connection (the
+scraper's included).
+
+    python query_service.py --port 8080
+    python query_service.py --benchmark
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+from collections import OrderedDict
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+import aiohttp
+
+from draw_history import DEFAULT_DB_PATH, MAX_BALL
+from frequency_index import FrequencyIndex
+
+DEFAULT_CACHE_SIZE = 256
+MAX_PAGE_SIZE = 500
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_BYTES = 512
+
+
+def row_to_record(row: Tuple) -> Dict[str, Any]:
+    """lotto_data row to the same field names the app reads from Supabase lotto_results"""
+    def to_int(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return 0
+
+    try:
+        jackpot = float(str(row[5]).replace('$', '').replace(',', ''))
+    except ValueError:
+        jackpot = 0.0
+    return {
+        'date': str(row[0])[:10],
+        'draw_num': to_int(row[1]),
+        'numbers': row[2],
+        'power_ball': to_int(row[3]),
+        'multiplier': to_int(row[4]),
+        'jackpot': jackpot,
+        'wins': to_int(row[6]),
+    }
+
+
+class ResponseCache:
+    """LRU of serialized responses: key -> (etag, body, gzipped body or None)"""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes, Optional[bytes]]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, payload: Any) -> Tuple[str, bytes, Optional[bytes]]:
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        compressed = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+        entry = (etag, body, compressed)
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self.entries.clear()
+
+
+class DrawQueryService:
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.cache = ResponseCache(cache_size)
+        self.index = FrequencyIndex.from_sqlite(db_path)
+        self.data_version = self._current_data_version()
+
+    def _current_data_version(self) -> int:
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _refresh_if_changed(self):
+        # data_version changes when another connection commits to the database file; this one never writes
+        version = self._current_data_version()
+        if version != self.data_version:
+            self.data_version = version
+            self.index = FrequencyIndex.from_sqlite(self.db_path)
+            self.cache.clear()
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        return self.conn.execute(sql, params).fetchall()
+
+    def latest(self, query: Dict[str, str]) -> Any:
+        rows = self._query(
+            "SELECT DrawDate, DrawNum, Numbers, Power_Ball, Multiplier, Jackpot, Wins FROM lotto_data "
+            "ORDER BY DrawDate DESC LIMIT 1"
+        )
+        if not rows:
+            raise web.HTTPNotFound(text='No draws available')
+        return row_to_record(rows[0])
+
+    def history(self, query: Dict[str, str]) -> Any:
+        """Newest first; `before` (a draw date) pages by key, `page` by offset"""
+        page_size = min(max(int(query.get('page_size', 50)), 1), MAX_PAGE_SIZE)
+        columns = "DrawDate, DrawNum, Numbers, Power_Ball, Multiplier, Jackpot, Wins"
+        if 'before' in query:
+            rows = self._query(
+                f"SELECT {columns} FROM lotto_data WHERE DrawDate < ? ORDER BY DrawDate DESC LIMIT ?",
+                (query['before'], page_size)
+            )
+            page = None
+        else:
+            page = max(int(query.get('page', 1)), 1)
+            rows = self._query(
+                f"SELECT {columns} FROM lotto_data ORDER BY DrawDate DESC LIMIT ? OFFSET ?",
+                (page_size, (page - 1) * page_size)
+            )
+        records = [row_to_record(r) for r in rows]
+        return {
+            'page': page,
+            'page_size': page_size,
+            'total': len(self.index),
+            'next_before': records[-1]['date'] if len(records) == page_size else None,
+            'results': records,
+        }
+
+    def frequency(self, query: Dict[str, str]) -> Any:
+        if 'last' in query:
+            counts = self.index.counts_last(int(query['last']))
+        else:
+            counts = self.index.counts_between(query.get('from'), query.get('to'))
+        return {
+            'counts': {str(ball): int(counts[ball]) for ball in range(1, MAX_BALL + 1)},
+            'most_common': [
+                {'number': ball, 'count': count}
+                for ball, count in FrequencyIndex.most_common(counts, int(query.get('top', 5)))
+            ],
+            'draws': int(counts[1:].sum()) // 5,
+        }
+
+    def _handler(self, compute):
+        async def handle(request: web.Request) -> web.Response:
+            self._refresh_if_changed()
+            key = request.path_qs
+            entry = self.cache.get(key)
+            if entry is None:
+                try:
+                    payload = compute(dict(request.query))
+                except ValueError as e:
+                    raise web.HTTPBadRequest(text=str(e))
+                entry = self.cache.put(key, payload)
+            etag, body, compressed = entry
+
+            headers = {
+                'ETag': etag,
+                'Cache-Control': 'no-cache',
+                'Vary': 'Accept-Encoding',
+                'Access-Control-Allow-Origin': '*',
+            }
+            if etag in request.headers.get('If-None-Match', ''):
+                return web.Response(status=304, headers=headers)
+            if compressed is not None and 'gzip' in request.headers.get('Accept-Encoding', ''):
+                headers['Content-Encoding'] = 'gzip'
+                body = compressed
+            return web.Response(body=body, headers=headers, content_type='application/json')
+        return handle
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            'draws': len(self.index),
+            'cache_entries': len(self.cache.entries),
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+        })
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/latest', self._handler(self.latest))
+        app.router.add_get('/history', self._handler(self.history))
+        app.router.add_get('/stats/frequency', self._handler(self.frequency))
+        app.router.add_get('/health', self.health)
+        app.on_cleanup.append(lambda _: self._close())
+        return app
+
+    async def _close(self):
+        self.conn.close()
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+async def _load_test(base_url: str, concurrency: int, duration: float, conditional: bool) -> Dict[str, Any]:
+    paths = ['/latest', '/history?page=1', '/history?page=2&page_size=100', '/stats/frequency',
+             '/stats/frequency?last=100', '/stats/frequency?from=2020-01-01&to=2020-12-31']
+    latencies = []
+    statuses = {}
+    etags = {}
+
+    async def client(worker: int):
+        async with aiohttp.ClientSession(headers={'Accept-Encoding': 'gzip'}) as session:
+            i = worker
+            deadline = perf_counter() + duration
+            while perf_counter() < deadline:
+                path = paths[i % len(paths)]
+                i += 1
+                headers = {'If-None-Match': etags[path]} if conditional and path in etags else {}
+                start = perf_counter()
+                async with session.get(base_url + path, headers=headers) as response:
+                    await response.read()
+                    latencies.append(perf_counter() - start)
+                    statuses[response.status] = statuses.get(response.status, 0) + 1
+                    if 'ETag' in response.headers:
+                        etags[path] = response.headers['ETag']
+
+    start = perf_counter()
+    await asyncio.gather(*(client(w) for w in range(concurrency)))
+    elapsed = perf_counter() - start
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'requests_per_second': len(latencies) / elapsed,
+        'p50_ms': _percentile(latencies, 50) * 1e3,
+        'p95_ms': _percentile(latencies, 95) * 1e3,
+        'p99_ms': _percentile(latencies, 99) * 1e3,
+        'statuses': statuses,
+    }
+
+
+def benchmark(db_path: str = DEFAULT_DB_PATH, port: int = 8765, concurrency: int = 32, duration: float = 5.0):
+    """Run the service in a subprocess and load-test it with and without conditional requests"""
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--db', db_path, '--port', str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f'http://127.0.0.1:{port}'
+
+    async def run():
+        async with aiohttp.ClientSession() as session:
+            for _ in range(100):
+                try:
+                    async with session.get(base_url + '/health') as response:
+                        if response.status == 200:
+                            break
+                except aiohttp.ClientConnectionError:
+                    await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError('Query service did not start')
+        print(f"{'mode':<14} {'requests':>9} {'req/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+        for label, conditional in (('full body', False), ('If-None-Match', True)):
+            result = await _load_test(base_url, concurrency, duration, conditional)
+            print(f"{label:<14} {result['requests']:>9} {result['requests_per_second']:>10.0f} "
+                  f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f}  {result['statuses']}")
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read-only HTTP service over the local Cashpot database')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE)
+    parser.add_argument('--benchmark', action='store_true', help='load-test a service started on --port')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.db, args.port, args.concurrency, args.duration)
+        return
+
+    service = DrawQueryService(args.db, args.cache_size)
+    print(f"[*] Serving {len(service.index)} draws from {args.db} on http://{args.host}:{args.port}")
+    web.run_app(service.make_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
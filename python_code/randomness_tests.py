@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Fairness statistics over the Cashpot draw history.
+
+Every test compares an observed statistic with a null distribution built from batched
+resamples: fair draws simulated from the same ball pool (frequency, per-ball, positional
+and pair tests) or random reorderings of the observed draws (runs and gap tests, which
+only look at the order draws came in). Resamples are generated in shards that can be
+spread over a process pool; each shard gets its own seed spawned from one SeedSequence.
+Reports are cached by history fingerprint.
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from math import comb
+from time import perf_counter
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from backtester import popcount
+from draw_history import BALLS_PER_DRAW, DEFAULT_DB_PATH, DrawHistory
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'randomness')
+
+# Gaps of this many draws or more share the last histogram bin of the gap test
+MAX_GAP = 30
+
+BOOTSTRAP_TESTS = ('frequency', 'per_ball', 'positional', 'pairs')
+PERMUTATION_TESTS = ('runs', 'gaps')
+
+
+def fair_draws(rng: np.random.Generator, batch: int, n: int, pool: int) -> np.ndarray:
+    """`batch` simulated histories of n fair draws, shape (batch, n, BALLS_PER_DRAW), balls sorted"""
+    # Partial Fisher-Yates shuffle: only the first BALLS_PER_DRAW slots of each row are swapped into place
+    rows = np.arange(batch * n)
+    shuffled = np.tile(np.arange(1, pool + 1, dtype=np.int8), (batch * n, 1))
+    for k in range(BALLS_PER_DRAW):
+        j = k + rng.integers(0, pool - k, batch * n)
+        picked = shuffled[rows, j]
+        shuffled[rows, j] = shuffled[rows, k]
+        shuffled[rows, k] = picked
+    balls = np.sort(shuffled[:, :BALLS_PER_DRAW], axis=1)
+    return balls.reshape(batch, n, BALLS_PER_DRAW)
+
+
+def _one_hot(balls: np.ndarray, pool: int) -> np.ndarray:
+    one_hot = np.zeros(balls.shape[:-1] + (pool + 1,), dtype=np.float32)
+    np.put_along_axis(one_hot, balls.astype(np.intp), 1, axis=-1)
+    return one_hot[..., 1:]
+
+
+def positional_expected(n: int, pool: int) -> np.ndarray:
+    """Expected (position, ball) counts for sorted fair draws: the order statistics of sampling without replacement"""
+    expected = np.zeros((BALLS_PER_DRAW, pool))
+    total = comb(pool, BALLS_PER_DRAW)
+    for k in range(BALLS_PER_DRAW):
+        for ball in range(1, pool + 1):
+            expected[k, ball - 1] = comb(ball - 1, k) * comb(pool - ball, BALLS_PER_DRAW - 1 - k) / total
+    return expected * n
+
+
+def gap_expected(total_gaps: np.ndarray, pool: int) -> np.ndarray:
+    """Expected gap-length histogram (1..MAX_GAP) if each ball appears independently with probability 5/pool"""
+    q = BALLS_PER_DRAW / pool
+    gaps = np.arange(1, MAX_GAP + 1)
+    probabilities = q * (1 - q) ** (gaps - 1)
+    probabilities[-1] = (1 - q) ** (MAX_GAP - 1)
+    return total_gaps[..., None] * probabilities
+
+
+def bootstrap_statistics(balls: np.ndarray, pool: int) -> Dict[str, np.ndarray]:
+    """Frequency, per-ball, positional and pair statistics for a batch of histories (batch, n, 5)"""
+    batch, n, _ = balls.shape
+    one_hot = _one_hot(balls, pool)
+
+    counts = one_hot.sum(axis=1)
+    expected = n * BALLS_PER_DRAW / pool
+    per_ball = np.abs(counts - expected)
+    frequency = ((counts - expected) ** 2 / expected).sum(axis=1)
+
+    flat = (np.arange(batch)[:, None, None] * BALLS_PER_DRAW + np.arange(BALLS_PER_DRAW)[None, None, :]) * (pool + 1) + balls
+    positions = np.bincount(flat.reshape(-1), minlength=batch * BALLS_PER_DRAW * (pool + 1))
+    positions = positions.reshape(batch, BALLS_PER_DRAW, pool + 1)[..., 1:]
+    pos_expected = positional_expected(n, pool)
+    populated = pos_expected > 0
+    positional = ((positions - pos_expected) ** 2)[:, populated] / pos_expected[populated]
+
+    pairs = np.matmul(one_hot.transpose(0, 2, 1), one_hot)
+    upper = np.triu_indices(pool, k=1)
+    pair_expected = n * BALLS_PER_DRAW * (BALLS_PER_DRAW - 1) / (pool * (pool - 1))
+    pair_chi2 = ((pairs[:, upper[0], upper[1]] - pair_expected) ** 2 / pair_expected).sum(axis=1)
+
+    return {
+        'frequency': frequency,
+        'per_ball': per_ball,
+        'positional': positional.sum(axis=1),
+        'pairs': pair_chi2,
+    }
+
+
+def permutation_statistics(masks: np.ndarray, pool: int) -> Dict[str, np.ndarray]:
+    """Runs and gap statistics for a batch of draw orderings given as bitmasks (batch, n)"""
+    batch, n = masks.shape
+    runs = popcount(masks[:, 1:] ^ masks[:, :-1]).sum(axis=1, dtype=np.int64) + pool
+
+    # Occurrences come back grouped by (resample, ball) and in draw order, so gaps are diffs within a group
+    present = ((masks[:, None, :] >> np.arange(1, pool + 1, dtype=np.uint32)[None, :, None]) & 1).astype(bool)
+    resample, ball, t = np.nonzero(present)
+    same_group = (resample[1:] == resample[:-1]) & (ball[1:] == ball[:-1])
+    gaps = np.minimum(np.diff(t)[same_group], MAX_GAP)
+    flat = resample[1:][same_group] * MAX_GAP + gaps - 1
+    histogram = np.bincount(flat, minlength=batch * MAX_GAP).reshape(batch, MAX_GAP)
+    expected = gap_expected(histogram.sum(axis=1), pool)
+    gap_chi2 = ((histogram - expected) ** 2 / expected).sum(axis=1)
+
+    return {'runs': runs.astype(np.float64), 'gaps': gap_chi2}
+
+
+# Observed draws shared with worker processes
+_WORKER_MASKS = None
+_WORKER_POOL = None
+
+
+def _init_worker(masks: np.ndarray, pool: int):
+    global _WORKER_MASKS, _WORKER_POOL
+    _WORKER_MASKS = masks
+    _WORKER_POOL = pool
+
+
+def _resample_shard(count: int, seed: np.random.SeedSequence, batch: int = 32) -> Dict[str, np.ndarray]:
+    """Null statistics for `count` bootstrap and `count` permutation resamples"""
+    rng = np.random.default_rng(seed)
+    n = len(_WORKER_MASKS)
+    collected = {name: [] for name in BOOTSTRAP_TESTS + PERMUTATION_TESTS}
+    for start in range(0, count, batch):
+        size = min(batch, count - start)
+        for name, values in bootstrap_statistics(fair_draws(rng, size, n, _WORKER_POOL), _WORKER_POOL).items():
+            collected[name].append(values)
+        orders = rng.permuted(np.tile(np.arange(n), (size, 1)), axis=1)
+        for name, values in permutation_statistics(_WORKER_MASKS[orders], _WORKER_POOL).items():
+            collected[name].append(values)
+    return {name: np.concatenate(values) for name, values in collected.items()}
+
+
+def _p_value(null: np.ndarray, observed: float) -> float:
+    """One-sided: how often the null is at least as extreme as the observation"""
+    return float((1 + np.count_nonzero(null >= observed)) / (1 + len(null)))
+
+
+def _two_sided_p_value(null: np.ndarray, observed: float) -> float:
+    high = (1 + np.count_nonzero(null >= observed)) / (1 + len(null))
+    low = (1 + np.count_nonzero(null <= observed)) / (1 + len(null))
+    return float(min(1.0, 2 * min(high, low)))
+
+
+class RandomnessSuite:
+    def __init__(self, history: DrawHistory, cache_dir: Optional[str] = CACHE_DIR):
+        valid = history.valid_mask()
+        self.version = history.version()
+        self.cache_dir = cache_dir
+        pools = history.pool_sizes()[valid]
+        balls = history.balls[valid]
+        masks = history.masks()[valid]
+        # Draws from different ball pools are tested separately
+        self.segments = {
+            int(pool): (balls[pools == pool].astype(np.int64), masks[pools == pool])
+            for pool in np.unique(pools)
+        }
+
+    @classmethod
+    def from_sqlite(cls, db_path: str = DEFAULT_DB_PATH, **kwargs) -> 'RandomnessSuite':
+        return cls(DrawHistory.from_sqlite(db_path), **kwargs)
+
+    def _cache_path(self, resamples: int, seed: int, shard_size: int) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        # shard_size decides how many seeds are spawned, so it is part of the report's identity
+        return os.path.join(self.cache_dir, f'{self.version}_{resamples}_{seed}_{shard_size}.json')
+
+    def _null_distribution(self, pool: int, resamples: int, seed: np.random.SeedSequence,
+                           workers: Optional[int], shard_size: int) -> Dict[str, np.ndarray]:
+        _, masks = self.segments[pool]
+        counts = [min(shard_size, resamples - start) for start in range(0, resamples, shard_size)]
+        seeds = seed.spawn(len(counts))
+        if workers == 1:
+            _init_worker(masks, pool)
+            shards = [_resample_shard(c, s) for c, s in zip(counts, seeds)]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(masks, pool)) as executor:
+                shards = list(executor.map(_resample_shard, counts, seeds))
+        return {name: np.concatenate([s[name] for s in shards]) for name in shards[0]}
+
+    def _segment_report(self, pool: int, null: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        balls, masks = self.segments[pool]
+        observed = bootstrap_statistics(balls[None], pool)
+        observed.update(permutation_statistics(masks[None], pool))
+        counts = np.bincount(balls.reshape(-1), minlength=pool + 1)[1:]
+
+        tests = {
+            name: {'statistic': float(observed[name][0]), 'p_value': _p_value(null[name], observed[name][0])}
+            for name in ('frequency', 'positional', 'pairs', 'gaps')
+        }
+        tests['runs'] = {
+            'statistic': float(observed['runs'][0]),
+            'null_mean': float(null['runs'].mean()),
+            'p_value': _two_sided_p_value(null['runs'], observed['runs'][0]),
+        }
+        tests['per_ball'] = {
+            str(ball): {
+                'count': int(counts[ball - 1]),
+                'p_value': _p_value(null['per_ball'][:, ball - 1], observed['per_ball'][0, ball - 1]),
+            }
+            for ball in range(1, pool + 1)
+        }
+        return {'draws': len(balls), 'pool': pool, 'tests': tests}
+
+    def run(self, resamples: int = 2000, seed: int = 0, workers: Optional[int] = None,
+            shard_size: int = 128, use_cache: bool = True) -> Dict[str, Any]:
+        """Run the full battery on every pool segment; workers=None uses all cores"""
+        if resamples < 1 or shard_size < 1:
+            raise ValueError(f"resamples and shard_size must be at least 1, got {resamples} and {shard_size}")
+        path = self._cache_path(resamples, seed, shard_size)
+        if use_cache and path and os.path.exists(path):
+            with open(path, 'r') as f:
+                report = json.load(f)
+            report['cached'] = True
+            return report
+
+        start = perf_counter()
+        segment_seeds = np.random.SeedSequence(seed).spawn(len(self.segments))
+        report = {
+            'history_version': self.version,
+            'resamples': resamples,
+            'seed': seed,
+            'shard_size': shard_size,
+            'segments': {},
+        }
+        for pool, segment_seed in zip(sorted(self.segments), segment_seeds):
+            null = self._null_distribution(pool, resamples, segment_seed, workers, shard_size)
+            report['segments'][f'pool-{pool}'] = self._segment_report(pool, null)
+        report['seconds'] = perf_counter() - start
+
+        if path:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+        report['cached'] = False
+        return report
+
+
+def print_report(report: Dict[str, Any]):
+    cached = ' (cached)' if report.get('cached') else ''
+    print(f"[*] History {report['history_version']}, {report['resamples']} resamples, "
+          f"{report['seconds']:.2f}s{cached}")
+    for name, segment in report['segments'].items():
+        print(f"\n[*] {name}: {segment['draws']} draws")
+        for test in ('frequency', 'positional', 'pairs', 'runs', 'gaps'):
+            result = segment['tests'][test]
+            print(f"    {test:<12} statistic {result['statistic']:>12.2f}   p = {result['p_value']:.4f}")
+        flagged = [(b, r['p_value']) for b, r in segment['tests']['per_ball'].items() if r['p_value'] < 0.05]
+        print(f"    per-ball     {len(flagged)} balls with p < 0.05: {flagged}")
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Randomness tests over the Cashpot draw history')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    parser.add_argument('--columnar', nargs='?', const='', metavar='STORE',
+                        help='read the Arrow store from columnar_export.py instead of SQLite')
+    parser.add_argument('--resamples', type=_positive_int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=0, help='worker processes, 0 for every core')
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args()
+
+    if args.columnar is not None:
+        suite = RandomnessSuite(DrawHistory.from_columnar(args.columnar or None, args.db))
+    else:
+        suite = RandomnessSuite.from_sqlite(args.db)
+    report = suite.run(args.resamples, seed=args.seed, workers=args.workers or None, use_cache=not args.no_cache)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Deadlines, retry backoff and a circuit breaker shared by the scraper and the Supabase migrator.
+
+A run gets one Deadline; every request's timeout is capped by what is left of it, and
+retries that would not finish in time are not attempted, so a cron job's worst-case runtime
+is the run deadline plus whatever local work is in progress when it expires. Retries wait
+a jittered exponential backoff that never drops below the crawl delay, and a CircuitBreaker
+stops the run after repeated failures instead of trying every queued request against a
+service that is down. Every outcome is tallied in Counters for the end-of-run summary.
+"""
+
+import random
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from time import monotonic
+from typing import Optional
+
+# Responses worth retrying: rate limited or a transient server-side failure
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class DeadlineExceeded(Exception):
+    """The run (or request) deadline has passed"""
+
+
+class CircuitOpenError(Exception):
+    """Calls are being refused because the circuit breaker is open"""
+
+
+class Deadline:
+    def __init__(self, seconds: Optional[float]):
+        self.seconds = seconds
+        self.expires_at = None if seconds is None else monotonic() + seconds
+
+    def remaining(self) -> float:
+        if self.expires_at is None:
+            return float('inf')
+        return max(self.expires_at - monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, request_timeout: float) -> float:
+        """Timeout for the next request: the per-request timeout capped by the time left"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f'Run deadline of {self.seconds}s exceeded')
+        return min(request_timeout, remaining)
+
+
+class Backoff:
+    """Exponential backoff with full jitter, floored at the crawl delay"""
+
+    def __init__(self, attempts: int = 3, base_delay: float = 1.0, max_delay: float = 30.0,
+                 min_delay: float = 0.0, rng: Optional[random.Random] = None):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.min_delay = min_delay
+        self.rng = rng or random.Random()
+
+    def delay(self, attempt: int) -> float:
+        """Wait before retry number `attempt` (1-based)"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return max(self.min_delay, self.rng.uniform(0, ceiling))
+
+    def delay_within(self, attempt: int, deadline: Deadline) -> float:
+        """Backoff delay, or DeadlineExceeded if waiting it out would overrun the deadline"""
+        delay = self.delay(attempt)
+        if delay >= deadline.remaining():
+            raise DeadlineExceeded('Not enough time left to retry')
+        return delay
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and refuses calls for `reset_timeout`
+    seconds; then lets one trial call through (half-open) and closes again if it succeeds.
+    Other callers keep being refused while the trial is in flight; a trial that never reports
+    back is given up on after another `reset_timeout`.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def check(self):
+        """Raise CircuitOpenError while the breaker is open, or half-open with a trial call in flight"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return
+            if state == 'half-open':
+                now = monotonic()
+                if self.trial_started is None or now - self.trial_started >= self.reset_timeout:
+                    self.trial_started = now
+                    return
+                raise CircuitOpenError(f'{self.name} circuit half-open, waiting for the trial call')
+            raise CircuitOpenError(f'{self.name} circuit open after {self.failures} consecutive failures')
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold or self.state == 'half-open':
+                self.opened_at = monotonic()
+                self.trial_started = None
+
+
+class Counters(Counter):
+    """Outcome tallies such as requests, successes, retries, timeouts, circuit_open and deadline"""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+
+    def add(self, outcome: str, n: int = 1):
+        """Thread-safe increment, for counters shared by download workers"""
+        with self._lock:
+            self[outcome] += n
+
+    @contextmanager
+    def stops(self):
+        """Count a CircuitOpenError or DeadlineExceeded raised inside the block, then re-raise it"""
+        try:
+            yield
+        except CircuitOpenError:
+            self.add('circuit_open')
+            raise
+        except DeadlineExceeded:
+            self.add('deadline')
+            raise
+
+    def summary(self) -> str:
+        return ', '.join(f'{k}={v}' for k, v in sorted(self.items())) or 'no requests'
@@ -4,22 +4,35 @@ import pandas as pd
 from io import StringIO
 import os
 import datetime
+import sys
+from urllib.parse import urlparse
 from uuid import uuid4
 import warnings
+from contextlib import nullcontext
 from time import perf_counter
 from sqlalchemy import create_engine, Column, Integer, String, Float, Text, DateTime, Date, ForeignKey, Table
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.ext.declarative import declarative_base
 
-# Import Supabase update functionality
+# Import Supabase update functionality (reported when a run reaches the sync, so importing stays quiet)
 try:
-    from migrate_to_supabase import update_supabase_with_new_data
+    from migrate_to_supabase import sync_changes_to_supabase
     SUPABASE_AVAILABLE = True
-    print("[*] Supabase update functionality imported successfully")
 except ImportError:
     SUPABASE_AVAILABLE = False
-    print("[*] Supabase update functionality not available - migrate_to_supabase.py not found")
 
+# Import jackpot time-series materialization
+try:
+    from jackpot_series import materialize as materialize_jackpot_series, latest_summary as jackpot_summary, \
+        pending_count as jackpot_pending_count
+    JACKPOT_SERIES_AVAILABLE = True
+except ImportError:
+    JACKPOT_SERIES_AVAILABLE = False
+
+import sync_outbox
+import stage_profiler
+from resilience import (Backoff, CircuitBreaker, CircuitOpenError, Counters, Deadline, DeadlineExceeded,
+                        RETRYABLE_STATUSES)
 from bs4 import BeautifulSoup as bs
 
 
@@ -32,11 +45,14 @@ cwd = os.getcwd()
 Database_Name = 'Lotto_Results_Database.db'
 Location = r'Database'
 WorkingDir = os.path.join(cwd, Location)
-if not os.path.exists(WorkingDir):
-    os.mkdir(WorkingDir)
 
 Database = os.path.join(WorkingDir,  Database_Name)
 
+# robots.txt Crawl-delay, and the time limits that bound a scheduled run
+CRAWL_DELAY = 5
+REQUEST_TIMEOUT = 30
+RUN_DEADLINE = float(os.environ.get('SCRAPER_RUN_DEADLINE', 900))
+
 Base = declarative_base()
 
 class Lotto_Result(Base):
@@ -70,41 +86,192 @@ class Lotto_Result(Base):
     def __repr__(self):
         return f"<Lotto_Result(DrawDate ='{self.DrawDate}'>"
 
+class LottoPlus_Result(Base):
+    __tablename__ = 'lotto_plus_data'
+
+    DrawDate = Column(Date, primary_key=True)
+    DrawNum = Column(String)
+    Numbers = Column(String)
+    Power_Ball = Column(String)
+    Multiplier = Column(String)
+    Jackpot = Column(String)
+    Wins = Column(String)
+    uniqueId = Column(String)
+    last_updated = Column(Date)
+    date_created = Column(Date)
+
+    def __repr__(self):
+        return f"<LottoPlus_Result(DrawDate ='{self.DrawDate}'>"
+
 def clean_jp(row):
     try:
         return float(str(row).replace('$','').replace(',',''))
     except : return 0
 
+def extract_month_rows(content, columns):
+    """Rows of a results page's table#monthResults: the draw date plus each cell named by `columns`"""
+    soup = bs(content, 'html.parser')
+
+    results_list = []
+    html_table = soup.find('table', id='monthResults')
+    if html_table:
+        date_rows = html_table.select('tr.lotto-date-tr')
+        data_rows = html_table.select('tr.lotto-tr')
+
+        for date_row, data_row in zip(date_rows, data_rows):
+            date = date_row.find('strong').get_text(strip=True)
+            cells = data_row.find_all('td')
+
+            record = {'Date': date}
+            for index, name in enumerate(columns):
+                record[name] = cells[index].get_text(strip=True)
+            results_list.append(record)
+    return results_list
+
+# Search form token the NLCB results pages expect with every month query
+NLCB_SID = 'edb39c21a4c68d22602f84b393b64a1552ac520445834ca7697a541c49e5dc4c'
+
+# lotto_data style model column -> scraped record field
+DRAW_FIELDS = {
+    'DrawNum': 'Draw#',
+    'Numbers': 'Numbers',
+    'Power_Ball': 'Power Ball',
+    'Multiplier': 'Multiplier',
+    'Jackpot': 'Jackpot',
+    'Wins': 'Wins',
+}
+
+class Game:
+    """
+    A draw game published as monthly result pages. Subclasses set the page URL, the cell
+    layout of its results table and the model (table) its draws are stored in.
+    """
+    name = None
+    url = None
+    columns = []
+    model = None
+
+    def params(self, year, month):
+        return {'search_month': f'{month}', 'search_year': f'{year}', 'sid': NLCB_SID, 'date_btn': 'SEARCH'}
+
+    def parse(self, content):
+        """Cleaned records from one month's results page"""
+        with stage_profiler.stage('parse'):
+            rows = extract_month_rows(content, self.columns)
+        with stage_profiler.stage('transform'):
+            table = pd.DataFrame(rows)
+            if table.empty:
+                raise ValueError("Parsing with BeautifulSoup failed to find any data.")
+            return self.clean(table).to_dict('records')
+
+    def clean(self, table):
+        table['Date'] = pd.to_datetime(table['Date'], format="%d-%b-%y").dt.strftime('%Y-%m-%d')
+        table['Jackpot'] = table['Jackpot'].apply(clean_jp)
+        table['Draw#'] = table['Draw#'].astype(int)
+        table['Multiplier'] = table['Multiplier'].str.replace("X", '-1').replace('No Data','-1').astype(int)
+        table['Wins'] = table['Wins'].str.replace("X", '-1').astype(int)
+        return table
+
+    def store(self, session, records):
+        """Insert the draws not already in this game's table; returns the inserted records"""
+        dates = {data['Date']: datetime.datetime.strptime(data['Date'], '%Y-%m-%d').date() for data in records}
+        existing = {
+            row[0] for row in
+            session.query(self.model.DrawDate).filter(self.model.DrawDate.in_(list(dates.values())))
+        }
+
+        inserted = []
+        now = datetime.datetime.now()
+        for data in records:
+            draw_date = dates[data['Date']]
+            if draw_date in existing:
+                continue
+            existing.add(draw_date)
+            values = {column: data.get(field) for column, field in DRAW_FIELDS.items()}
+            session.add(self.model(DrawDate=draw_date, uniqueId=str(uuid4()).split('-')[4],
+                                   last_updated=now, date_created=now, **values))
+            inserted.append(data)
+        session.commit()
+        return inserted
+
+class CashpotGame(Game):
+    name = 'cashpot'
+    url = 'https://www.nlcbplaywhelotto.com/nlcb-cashpot-results/'
+    columns = ['Draw#', 'Numbers', 'Multiplier', 'Jackpot', 'Wins']
+    model = Lotto_Result
+
+    def clean(self, table):
+        table = super().clean(table)
+        # Cashpot has no Power Ball column
+        table['Power Ball'] = 1
+        return table
+
+    def store(self, session, records):
+        # lotto_data goes through add_lotto_data_to_db so insert hooks still fire
+        return add_lotto_data_to_db(session, records)
+
+class LottoPlusGame(Game):
+    name = 'lotto_plus'
+    url = 'https://www.nlcbplaywhelotto.com/nlcb-lotto-plus-results/'
+    columns = ['Draw#', 'Numbers', 'Power Ball', 'Multiplier', 'Jackpot', 'Wins']
+    model = LottoPlus_Result
+
+    def clean(self, table):
+        table = super().clean(table)
+        table['Power Ball'] = table['Power Ball'].astype(int)
+        return table
+
+GAMES = {game.name: game for game in (CashpotGame(), LottoPlusGame())}
+
+# Games scraped by default, e.g. SCRAPER_GAMES=cashpot,lotto_plus
+ENABLED_GAMES = [name.strip() for name in os.environ.get('SCRAPER_GAMES', 'cashpot').split(',') if name.strip()]
+
+class HostSession:
+    """One HTTP session, crawl-delay budget and circuit breaker shared by every game on a host"""
+
+    def __init__(self, host, session, crawl_delay=CRAWL_DELAY, breaker_reset=RUN_DEADLINE):
+        self.host = host
+        self.session = session
+        self.crawl_delay = crawl_delay
+        self.breaker = CircuitBreaker(host, failure_threshold=3, reset_timeout=breaker_reset)
+        self.last_request_time = None
+
+    async def wait_turn(self):
+        """Sleep until the crawl delay has passed since this host's previous response"""
+        if self.last_request_time is not None:
+            wait = self.last_request_time + self.crawl_delay - perf_counter()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+    def request_finished(self):
+        self.last_request_time = perf_counter()
+
 class WebScraper:
-    def __init__(self, urls):
-        self.urls = urls
-        self.ParsedData = []
+    def __init__(self, games=None, run_deadline=RUN_DEADLINE, request_timeout=REQUEST_TIMEOUT):
+        self.games = games or [GAMES[name] for name in ENABLED_GAMES]
+        self.results = {game.name: [] for game in self.games}
+        # Cashpot records feed the analysis report and the Supabase sync
+        self.ParsedData = self.results.get('cashpot', [])
         self.request_count = 0
-        self.last_request_time = 0
+        self.run_deadline = run_deadline
+        self.request_timeout = request_timeout
+        self.deadline = Deadline(run_deadline)
+        # Retries are requests too, so they never come sooner than the crawl delay
+        self.backoff = Backoff(attempts=3, base_delay=CRAWL_DELAY * 2, max_delay=60, min_delay=CRAWL_DELAY)
+        self.counters = Counters()
         
     def check_visit_time(self):
         """Check if current time is within allowed visiting hours (0600-1000)"""
         current_hour = datetime.datetime.now().hour
         return True
-        
-    def should_respect_rate_limit(self):
-        """Ensure we don't exceed 1 request per 5 seconds"""
-        current_time = perf_counter()
-        if current_time - self.last_request_time < 5:
-            return False
-        return True
 
-    async def fetch(self, session, year, month, url):
+    async def fetch(self, host, game, year, month):
         # Check if we're within allowed visiting hours
         if not self.check_visit_time():
             print(f'[*] Outside allowed visiting hours (0600-1000). Current time: {datetime.datetime.now().strftime("%H:%M")}')
             return None
             
-        # Ensure rate limiting
-        while not self.should_respect_rate_limit():
-            await asyncio.sleep(1)
-            
-        params = {'search_month': f'{month}', 'search_year': f'{year}', 'sid':'edb39c21a4c68d22602f84b393b64a1552ac520445834ca7697a541c49e5dc4c', 'date_btn':'SEARCH'}
+        params = game.params(year, month)
         headers = {
             'User-Agent': 'LottoScraper/1.0 (Respectful bot following robots.txt guidelines)',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -114,126 +281,132 @@ class WebScraper:
         }
            
        
-        # Update request tracking
-        self.request_count += 1
-        self.last_request_time = perf_counter()
-        
-        retries = 3
-        for attempt in range(retries):
+        for attempt in range(1, self.backoff.attempts + 1):
+            # Raises CircuitOpenError / DeadlineExceeded, which end this host's crawl
+            with self.counters.stops():
+                host.breaker.check()
+            await host.wait_turn()
+            with self.counters.stops():
+                timeout = aiohttp.ClientTimeout(total=self.deadline.timeout(self.request_timeout))
+
+            # Update request tracking
+            self.request_count += 1
+            self.counters.add('requests')
+
+            # Only set once the whole body has arrived, so a read that fails after the headers is retried
+            status = None
+            response_content = None
             try:
-                async with session.post(url, data=params, headers=headers) as response:
+                async with host.session.post(game.url, data=params, headers=headers, timeout=timeout) as response:
                     # Save the raw HTML response for debugging
                     response_content = await response.content.read()
-                    filename = f'response_{month}_{year}.html'
+                    status = response.status
+                    filename = f'response_{game.name}_{month}_{year}.html'
                     # with open(filename, 'wb') as file:
                     #     file.write(response_content)
                     # print(f'[*] Saved response to: {filename}')
 
+            except asyncio.TimeoutError:
+                self.counters.add('timeouts')
+                error = f'Timed out after {timeout.total:.1f}s'
+            except aiohttp.ClientError as e:
+                self.counters.add('connection_errors')
+                error = f'Connection error {e.__class__.__name__}'
+            finally:
+                # Parsing below overlaps with the crawl delay before the next request
+                host.request_finished()
+
+            if status == 200:
+                host.breaker.record_success()
+                self.counters.add('successes')
+                try:
+                    records = game.parse(response_content.decode('utf-8', errors='ignore'))
+                    print('[*] Data Scraped : ', game.name, params['search_month'], params['search_year'])
+                    return records
 
+                except Exception as e:
+                    self.counters.add('parse_errors')
+                    print(f'[*] Error {e} Occurred : {game.name} {month}-{year}')
+                    return None
+            elif status is not None and status not in RETRYABLE_STATUSES:
+                # The site answered, it just refused this request
+                host.breaker.record_success()
+                self.counters.add('http_errors')
+                print(f'[*] Error {status} Occurred while fetching data for {game.name} {month}-{year}')
+                return None
+            elif status is not None:
+                self.counters.add('server_errors')
+                error = f'Server error {status}'
+
+            host.breaker.record_failure()
+            if attempt == self.backoff.attempts:
+                print(f'[*] {error}. Maximum retries reached for {game.name} {month}-{year}.')
+                return None
+            with self.counters.stops():
+                delay = self.backoff.delay_within(attempt, self.deadline)
+            self.counters.add('retries')
+            print(f'[*] {error}. Retrying in {delay:.1f}s... Attempt {attempt + 1}/{self.backoff.attempts}')
+            await asyncio.sleep(delay)
+
+    async def crawl_host(self, host_name, games, months):
+        """Fetch every month of every game on one host, month by month so the games interleave"""
+        requests_to_make = [(game, year, month) for year, month in months for game in games]
+        timeout = aiohttp.ClientTimeout(total=self.request_timeout, connect=10)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            host = HostSession(host_name, session, breaker_reset=self.run_deadline or RUN_DEADLINE)
+            for i, (game, year, month) in enumerate(requests_to_make, 1):
+                print(f'[*] Processing request {i}/{len(requests_to_make)} on {host_name}: {game.name} {month}-{year}')
+                try:
+                    data = await self.fetch(host, game, year, month)
+                except (CircuitOpenError, DeadlineExceeded) as e:
+                    skipped = len(requests_to_make) - i + 1
+                    self.counters.add('skipped', skipped)
+                    print(f'[*] Stopping {host_name} early: {e}. Skipped {skipped} remaining requests')
+                    break
+                if data is not None:
+                    self.results[game.name].extend(data)
+                    print(f'[*] Successfully scraped {len(data)} {game.name} records for {month}-{year}')
+                else:
+                    print(f'[*] No data retrieved for {game.name} {month}-{year}')
 
+    async def main(self):
+        current_year = datetime.datetime.now().year
+        current_month = datetime.datetime.now().strftime('%b')
+        current_month_index = MONTH.index(current_month)
 
+        months = [
+            (year, month)
+            for year in YEAR
+            for month_index, month in enumerate(MONTH)
+            if not (int(year) > current_year or (int(year) == current_year and month_index > current_month_index))
+        ]
 
-                    if response.status == 200:
-                        try:
-                            # 1. Decode the raw response content
-                            content = response_content.decode('utf-8', errors='ignore')
-                            
-                            # 2. Parse the HTML with BeautifulSoup
-                            soup = bs(content, 'html.parser')
-                            
-                            results_list = []
-                            html_table = soup.find('table', id='monthResults')
-                            
-                            # 3. Use the clean 'zip' method to extract data
-                            if html_table:
-                                date_rows = html_table.select('tr.lotto-date-tr')
-                                data_rows = html_table.select('tr.lotto-tr')
-
-                                for date_row, data_row in zip(date_rows, data_rows):
-                                    date = date_row.find('strong').get_text(strip=True)
-                                    cells = data_row.find_all('td')
-                                    
-                                    results_list.append({
-                                        'Date': date,
-                                        'Draw#': cells[0].get_text(strip=True),
-                                        'Numbers': cells[1].get_text(strip=True),
-                                        'Multiplier': cells[2].get_text(strip=True),
-                                        'Jackpot': cells[3].get_text(strip=True),
-                                        'Wins': cells[4].get_text(strip=True)
-                                    })
-
-                            # 4. Create the DataFrame and check if it's empty
-                            table = pd.DataFrame(results_list)
-                            if table.empty:
-                                raise ValueError("Parsing with BeautifulSoup failed to find any data.")
-
-                            print('[*] Data Scraped : ', params['search_month'], params['search_year'])
-                            
-                            # 5. Apply your original data cleaning and type conversions
-                            table['Date'] = pd.to_datetime(table['Date'], format="%d-%b-%y").dt.strftime('%Y-%m-%d')
-                            table['Jackpot'] = table['Jackpot'].apply(clean_jp)
-                            table['Draw#'] = table['Draw#'].astype(int)
-                            # The new HTML doesn't have a 'Power Ball' column, so this line is commented out.
-                            table['Power Ball'] = 1
-                            table['Multiplier'] = table['Multiplier'].str.replace("X", '-1').replace('No Data','-1').astype(int)
-                            table['Wins'] = table['Wins'].str.replace("X", '-1').astype(int)
-                            
-                            return table.to_dict('records')
-
-                        except Exception as e:
-                            print(f'[*] Error {e} Occurred : {month}-{year}')
-                            return None
-                    else:
-                        print(f'[*] Error {response.status} Occurred while fetching data for {month}-{year}')
-                        return None
-
-            except aiohttp.ClientConnectionError:
-                if attempt < retries - 1:
-                    print(f'[*] Connection error occurred. Retrying... Attempt {attempt + 1}/{retries}')
-                    await asyncio.sleep(2)  # Wait before retrying
-                else:
-                    print('[*] Maximum retries reached. Unable to establish connection.')
-                    return None
+        # Games on the same host share one session and one crawl budget; separate hosts run concurrently
+        hosts = {}
+        for game in self.games:
+            hosts.setdefault(urlparse(game.url).netloc, []).append(game)
 
-    async def main(self):
-        async with aiohttp.ClientSession() as session:
-            current_year = datetime.datetime.now().year
-            current_month = datetime.datetime.now().strftime('%b')
-            current_month_index = MONTH.index(current_month)
-
-            # Create list of all requests to make
-            requests_to_make = [
-                (year, month, url)
-                for year in YEAR
-                for month_index, month in enumerate(MONTH)
-                for url in self.urls
-                if not (int(year) > current_year or (int(year) == current_year and month_index > current_month_index))
-            ]
-
-            # Process requests with rate limiting (1 request per 5 seconds as per robots.txt)
-            print(f'[*] Starting scraping with {len(requests_to_make)} requests to process')
-            print(f'[*] Respecting robots.txt: Visit-time 0600-1000, Request-rate 1/5, Crawl-delay 5')
-            
-            for i, (year, month, url) in enumerate(requests_to_make, 1):
-                print(f'[*] Processing request {i}/{len(requests_to_make)}: {month}-{year}')
-                print(f'[*] URL: {url}')
-                # print(f'[*] Params: {params}')
-                # print(f'[*] Headers: {headers}')
-                data = await self.fetch(session, year, month, url)
-                if data is not None:
-                    self.ParsedData.extend(data)
-                    print(f'[*] Successfully scraped {len(data)} records for {month}-{year}')
-                else:
-                    print(f'[*] No data retrieved for {month}-{year}')
-                
-                # Additional delay to ensure we respect the rate limit
-                if i < len(requests_to_make):  # Don't sleep after the last request
-                    print(f'[*] Waiting 5 seconds before next request...')
-                    await asyncio.sleep(5)
+        print(f'[*] Starting scraping of {", ".join(g.name for g in self.games)}: '
+              f'{len(months) * len(self.games)} requests across {len(hosts)} host(s)')
+        print(f'[*] Respecting robots.txt: Visit-time 0600-1000, Request-rate 1/{CRAWL_DELAY}, Crawl-delay {CRAWL_DELAY}')
+
+        await asyncio.gather(*(self.crawl_host(host, games, months) for host, games in hosts.items()))
+
+        print(f'[*] Request outcomes: {self.counters.summary()}')
 
 
 
+# Callables run after add_lotto_data_to_db commits, each receiving the list of newly inserted records
+INSERT_HOOKS = []
+
+def register_insert_hook(hook):
+    """Register a callable notified with the records inserted into lotto_data"""
+    if hook not in INSERT_HOOKS:
+        INSERT_HOOKS.append(hook)
+    return hook
+
 def add_lotto_data_to_db(session, lotto_data):
+    inserted = []
 
     for data in lotto_data:
 
@@ -266,14 +439,37 @@ def add_lotto_data_to_db(session, lotto_data):
                     )
 
                     session.add(lotto_instance)
+                    inserted.append(data)
                 except Exception as e:
                     print('[*] Error:', e)
     session.commit()
 
-def generate_html_report(basic_analysis_report, additional_analysis_report, latest_entry, common_numbers, average_jackpot):
+    if inserted:
+        for hook in INSERT_HOOKS:
+            try:
+                hook(inserted)
+            except Exception as e:
+                print(f'[*] Insert hook {getattr(hook, "__name__", hook)} failed: {e}')
+    return inserted
+
+def generate_html_report(basic_analysis_report, additional_analysis_report, latest_entry, common_numbers, average_jackpot, jackpot_trend=None):
     # Format average jackpot as cash value
     average_jackpot_cash = "${:,.2f}".format(average_jackpot)
 
+    # Jackpot trend from the materialized jackpot_series table
+    jackpot_trend_html = ""
+    if jackpot_trend:
+        def cash(value):
+            return "${:,.2f}".format(value) if value is not None else "Not published"
+        jackpot_trend_html = f"""<div class="jackpot-trend">
+                <h2>Jackpot Trend:</h2>
+                <p>All-time average jackpot: {cash(jackpot_trend['AverageJackpot'])}<br>
+                10-draw average: {cash(jackpot_trend['RollingMean10'])}<br>
+                50-draw average: {cash(jackpot_trend['RollingMean50'])}<br>
+                Current rollover streak: {jackpot_trend['Streak']} draws<br>
+                Longest rollover streak: {jackpot_trend['MaxStreak']} draws</p>
+            </div>"""
+
     # Split numbers drawn and format them
     numbers_drawn_list = latest_entry['Numbers'].split("|")
     numbers_drawn_formatted = ", ".join(numbers_drawn_list)
@@ -300,6 +496,7 @@ def generate_html_report(basic_analysis_report, additional_analysis_report, late
                 <h2>Average Jackpot Amount:</h2>
                 <p>{average_jackpot_cash}</p>
             </div>
+            {jackpot_trend_html}
             <div class="most-common-numbers">
                 <h3>Top 5 Most Common Numbers Drawn:</h3>
                 <table>
@@ -329,58 +526,110 @@ def generate_html_report(basic_analysis_report, additional_analysis_report, late
         """
     return html_report
 
-async def run_scraper(urls, db_session):
-    scraper = WebScraper(urls)
-    await scraper.main()
-    add_lotto_data_to_db(db_session, scraper.ParsedData)
+async def run_scraper(db_session, games=None):
+    scraper = WebScraper(games)
+    with stage_profiler.stage('fetch'):
+        await scraper.main()
+    with stage_profiler.stage('db_insert'):
+        for game in scraper.games:
+            inserted = game.store(db_session, scraper.results[game.name])
+            print(f"[*] {game.name}: {len(inserted)} new draws stored in {game.model.__tablename__}")
+
+    # Bring the jackpot time series up to date with the rows just inserted
+    with stage_profiler.stage('analytics'):
+        jackpot_trend = None
+        if JACKPOT_SERIES_AVAILABLE:
+            try:
+                written = materialize_jackpot_series(Database)
+                print(f"[*] Jackpot series: {written} draws recomputed")
+                jackpot_trend = jackpot_summary(Database)
+            except Exception as e:
+                print(f"[*] Warning: Failed to update jackpot series: {e}")
+        else:
+            print("[*] Jackpot series not available - jackpot_series.py or numpy not found")
 
     # Update Supabase with new data if available
-    if SUPABASE_AVAILABLE and scraper.ParsedData:
-        try:
-            print("[*] Updating Supabase with new data...")
-            new_records_count = update_supabase_with_new_data(scraper.ParsedData)
-            print(f"[*] Supabase updated successfully with {new_records_count} new records")
-        except Exception as e:
-            print(f"[*] Warning: Failed to update Supabase: {e}")
-            print("[*] Data was still saved to local database")
-    else:
-        print("[*] Supabase update skipped - functionality not available or no new data")
+    with stage_profiler.stage('sync'):
+        # The outbox and jackpot_series hold this run's changes plus anything an earlier sync did not get to.
+        # Before the first sync the outbox does not exist yet; that sync installs it and queues what Supabase lacks
+        outbox_installed = sync_outbox.is_installed(Database)
+        pending = sync_outbox.pending_count(Database) if outbox_installed else 0
+        if JACKPOT_SERIES_AVAILABLE:
+            pending += jackpot_pending_count(Database)
+        if SUPABASE_AVAILABLE and (pending or not outbox_installed):
+            try:
+                print("[*] Updating Supabase with new data...")
+                new_records_count = sync_changes_to_supabase(Database)
+                print(f"[*] Supabase updated successfully with {new_records_count} new records")
+            except Exception as e:
+                print(f"[*] Warning: Failed to update Supabase: {e}")
+                print("[*] Data was still saved to local database")
+        elif not SUPABASE_AVAILABLE:
+            print("[*] Supabase update skipped - migrate_to_supabase.py could not be imported")
+        else:
+            print("[*] Supabase update skipped - no pending changes")
+
+    if not scraper.ParsedData:
+        print("[*] No Cashpot draws scraped - analysis report skipped")
+        return
 
     # Perform basic analysis
-    total_draws = len(scraper.ParsedData)
+    with stage_profiler.stage('analytics'):
+        total_draws, average_jackpot, most_common_numbers = frequency_analysis(scraper.ParsedData)
+
+        # Generate basic analysis report
+
+        basic_analysis_report = f"Total number of draws: {total_draws}\n"
+        common_numbers = []
+        for number, count in most_common_numbers.items():
+            common_numbers.append((number, f"{count} times\n"))
+
+        # Perform additional analysis
+        additional_analysis_report, latest_entry = additional_analysis(scraper.ParsedData)
+
+    # Generate HTML report
+    with stage_profiler.stage('report'):
+        html_report = generate_html_report(basic_analysis_report, additional_analysis_report, latest_entry, common_numbers, average_jackpot, jackpot_trend)
+
+        # Write HTML report to file
+        with open('analysis_report.html', 'w') as file:
+            file.write(html_report)
+
+    print("Analysis reports generated successfully.")
+
+def frequency_analysis(parsed_data, top=5):
+    """Number of draws, average jackpot and the `top` most drawn numbers (a Series of counts)"""
+    total_draws = len(parsed_data)
     try:
-        average_jackpot = sum(float(result['Jackpot']) for result in scraper.ParsedData) / total_draws
+        average_jackpot = sum(float(result['Jackpot']) for result in parsed_data) / total_draws
     except Exception as e:
         average_jackpot = 0.0
 
     # Extract all numbers drawn
-    all_numbers = [result['Numbers'].split("|") for result in scraper.ParsedData]
+    all_numbers = [result['Numbers'].split("|") for result in parsed_data]
     flat_numbers = [int(number) for sublist in all_numbers for number in sublist]
 
     # Calculate the frequency of each number
     number_counts = pd.Series(flat_numbers).value_counts()
 
     # Find the most common numbers drawn
-    most_common_numbers = number_counts.head(5)
-
-    # Generate basic analysis report
-
-    basic_analysis_report = f"Total number of draws: {total_draws}\n"
-    common_numbers = []
-    for number, count in most_common_numbers.items():
-        common_numbers.append((number, f"{count} times\n"))
-
-    # Perform additional analysis
-    additional_analysis_report, latest_entry = additional_analysis(scraper.ParsedData)
-
-    # Generate HTML report
-    html_report = generate_html_report(basic_analysis_report, additional_analysis_report, latest_entry, common_numbers, average_jackpot)
-
-    # Write HTML report to file
-    with open('analysis_report.html', 'w') as file:
-        file.write(html_report)
-
-    print("Analysis reports generated successfully.")
+    return total_draws, average_jackpot, number_counts.head(top)
+
+def parse_profile_options(argv):
+    """--profile [cpu|memory|all], --profile-dir DIR and --profile-nested; None when profiling is off"""
+    if '--profile' not in argv:
+        return None
+    i = argv.index('--profile')
+    mode = argv[i + 1] if i + 1 < len(argv) and not argv[i + 1].startswith('--') else 'all'
+    if mode not in ('cpu', 'memory', 'all'):
+        print(f'[*] Unknown profile mode: {mode}')
+        sys.exit(1)
+    options = {'cpu': mode in ('cpu', 'all'), 'memory': mode in ('memory', 'all')}
+    if '--profile-dir' in argv and argv.index('--profile-dir') + 1 < len(argv):
+        options['run_dir'] = argv[argv.index('--profile-dir') + 1]
+    # Allocation snapshots around every stage, parse/transform included, instead of top-level stages only
+    options['nested_snapshots'] = '--profile-nested' in argv
+    return options
 
 def additional_analysis(data):
       # Get the latest entry
@@ -412,21 +661,26 @@ if __name__ == "__main__":
         #     print('[*] Exiting...')
         #     exit()
     
-    urls = ['https://www.nlcbplaywhelotto.com/nlcb-cashpot-results/']
+    os.makedirs(WorkingDir, exist_ok=True)
     engine = create_engine(f'sqlite:///{Database}',  echo=False)
     Base.metadata.create_all(engine)
     Session = sessionmaker(bind=engine)
     db_session = Session()
-    try:
-        asyncio.run(run_scraper(urls, db_session))
-        print('[*] Adding Data to Database ... ')
-
-    except IndentationError as e:
-        print('*'*100)
-        print(f'Error Occurred : {e}')
-        print('*'*100)
-    finally:
-        db_session.close()
+
+    # --profile: per-stage cProfile/tracemalloc capture written to cache/profiles/<run>
+    profile_options = parse_profile_options(sys.argv[1:])
+    profiler = stage_profiler.StageProfiler(**profile_options) if profile_options else nullcontext()
+    with profiler:
+        try:
+            asyncio.run(run_scraper(db_session))
+            print('[*] Adding Data to Database ... ')
+
+        except IndentationError as e:
+            print('*'*100)
+            print(f'Error Occurred : {e}')
+            print('*'*100)
+        finally:
+            db_session.close()
 
     stop = perf_counter()
     print("[*] Time taken : ", stop - start)
\ No newline at end of file
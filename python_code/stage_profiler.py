@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Per-stage profiling for scraper runs (python scraper.py --profile).
+
+Pipeline code marks its stages with `stage_profiler.stage('parse')` etc., which does nothing
+unless a StageProfiler is active. When one is, every stage gets its own cProfile profile
+and tracemalloc allocation tally. Stages may nest (parse runs inside fetch); time and
+allocations are charged to the innermost stage only, so the stage totals add up to the run.
+Net and peak traced memory are read per stage from tracemalloc's counters, which is cheap.
+The per-line allocation breakdown needs snapshots, which take a good fraction of a second
+each, so by default they are taken only around top-level stages (a nested stage's lines are
+listed under the stage it runs in); nested_snapshots=True (--profile-nested) takes them
+around every stage. Snapshots are taken outside the stage timers, so they do not inflate
+stage times (they show up as "(outside)" instead).
+On finish the run directory holds one `<stage>.pstats` per stage, `<stage>_allocations.txt`
+with the lines that allocated the most, and `summary.json`.
+
+Compare two runs, or print one:
+
+    python stage_profiler.py cache/profiles/20250101-063000 cache/profiles/20250102-063000
+    python stage_profiler.py cache/profiles/20250102-063000
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from time import perf_counter
+from typing import Any, Dict, Optional
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'profiles')
+
+# Allocation sites kept per stage in summary.json and the allocations file
+TOP_ALLOCATIONS = 25
+
+# Allocations made by the snapshots themselves are not charged to any stage
+SNAPSHOT_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+
+_active: Optional['StageProfiler'] = None
+
+
+def stage(name: str):
+    """Context manager for one pipeline stage; a no-op unless a StageProfiler is active"""
+    if _active is None:
+        return nullcontext()
+    return _active.stage(name)
+
+
+class StageProfiler:
+    def __init__(self, run_dir: Optional[str] = None, cpu: bool = True, memory: bool = True,
+                 nested_snapshots: bool = False):
+        self.run_dir = run_dir or os.path.join(DEFAULT_PROFILE_DIR, datetime.now().strftime('%Y%m%d-%H%M%S'))
+        self.cpu = cpu
+        self.memory = memory
+        self.nested_snapshots = nested_snapshots
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.profiles: Dict[str, cProfile.Profile] = {}
+        self.allocations: Dict[str, Counter] = {}
+        # Open stages, innermost last:
+        # [name, resumed_at, snapshot at entry or None, traced_at_resume, sites of snapshotted nested stages]
+        self.stack = []
+        self.started = None
+
+    def __enter__(self) -> 'StageProfiler':
+        global _active
+        if self.memory:
+            tracemalloc.start()
+        self.started = perf_counter()
+        _active = self
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        _active = None
+        self.finish()
+
+    def _resume(self, entry):
+        if self.memory:
+            entry[3] = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        if self.cpu:
+            self.profiles.setdefault(entry[0], cProfile.Profile()).enable()
+        entry[1] = perf_counter()
+
+    def _pause(self, entry):
+        totals = self.stages[entry[0]]
+        totals['seconds'] += perf_counter() - entry[1]
+        if self.cpu:
+            self.profiles[entry[0]].disable()
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            totals['net_bytes'] += current - entry[3]
+            totals['peak_bytes'] = max(totals['peak_bytes'], peak - entry[3])
+
+    def _stage_sites(self, entry) -> Counter:
+        """Net allocation per source line between the stage's entry and now, nested stages included"""
+        sites = Counter()
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        for stat in snapshot.compare_to(entry[2], 'lineno'):
+            if stat.size_diff:
+                frame = stat.traceback[0]
+                sites[f'{frame.filename}:{frame.lineno}'] += stat.size_diff
+        return sites
+
+    @contextmanager
+    def stage(self, name: str):
+        if self.stack:
+            self._pause(self.stack[-1])
+        totals = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'peak_bytes': 0, 'net_bytes': 0})
+        totals['calls'] += 1
+        entry = [name, None, None, 0, Counter()]
+        if self.memory and (self.nested_snapshots or not self.stack):
+            entry[2] = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        self.stack.append(entry)
+        self._resume(entry)
+        try:
+            yield
+        finally:
+            self._pause(entry)
+            self.stack.pop()
+            if entry[2] is not None:
+                sites = self._stage_sites(entry)
+                # Snapshotted nested stages were charged their own share; keep only what this stage allocated itself
+                own = Counter(sites)
+                own.subtract(entry[4])
+                self.allocations.setdefault(name, Counter()).update(own)
+                if self.stack:
+                    self.stack[-1][4].update(sites)
+            if self.stack:
+                self._resume(self.stack[-1])
+
+    def finish(self) -> Dict[str, Any]:
+        """Write the profiles, allocation tallies and summary.json; returns the summary"""
+        if self.memory:
+            tracemalloc.stop()
+        os.makedirs(self.run_dir, exist_ok=True)
+
+        summary = {'total_seconds': perf_counter() - self.started, 'stages': {}}
+        for name, totals in self.stages.items():
+            if name in self.profiles:
+                self.profiles[name].dump_stats(os.path.join(self.run_dir, f'{name}.pstats'))
+            top = []
+            if name in self.allocations:
+                top = [
+                    {'site': site, 'bytes': size}
+                    for site, size in sorted(self.allocations[name].items(), key=lambda x: -abs(x[1]))[:TOP_ALLOCATIONS]
+                ]
+                with open(os.path.join(self.run_dir, f'{name}_allocations.txt'), 'w') as file:
+                    file.write(f'Net allocations during stage {name} (KiB, largest first)\n')
+                    for item in top:
+                        file.write(f"{item['bytes'] / 1024:>12.1f}  {item['site']}\n")
+            summary['stages'][name] = dict(totals, top_allocations=top)
+
+        with open(os.path.join(self.run_dir, 'summary.json'), 'w') as file:
+            json.dump(summary, file, indent=2)
+        print_summary(summary)
+        print(f'[*] Profile written to {self.run_dir}')
+        return summary
+
+
+def load_summary(run_dir: str) -> Dict[str, Any]:
+    with open(os.path.join(run_dir, 'summary.json')) as file:
+        return json.load(file)
+
+
+def print_summary(summary: Dict[str, Any]):
+    print(f"{'stage':<12} {'calls':>6} {'seconds':>9} {'share':>7} {'peak KiB':>10} {'net KiB':>10}")
+    total = summary['total_seconds'] or 1e-9
+    for name, s in summary['stages'].items():
+        print(f"{name:<12} {s['calls']:>6} {s['seconds']:>9.3f} {s['seconds'] / total:>7.1%} "
+              f"{s['peak_bytes'] / 1024:>10.1f} {s['net_bytes'] / 1024:>10.1f}")
+    # Waiting between stages, plus tracemalloc snapshot time when memory profiling is on
+    outside = summary['total_seconds'] - sum(s['seconds'] for s in summary['stages'].values())
+    print(f"{'(outside)':<12} {'':>6} {outside:>9.3f} {outside / total:>7.1%}")
+    print(f"{'total':<12} {'':>6} {summary['total_seconds']:>9.3f}")
+
+
+def _function_times(path: str) -> Dict[str, float]:
+    """Own time per function from a .pstats file, keyed 'file:line(function)'"""
+    if not os.path.exists(path):
+        return {}
+    times = {}
+    for (filename, line, function), (_, _, tottime, _, _) in pstats.Stats(path).stats.items():
+        times[f'{os.path.basename(filename)}:{line}({function})'] = tottime
+    return times
+
+
+def diff_runs(run_a: str, run_b: str, top: int = 10):
+    """Print per-stage time and memory changes from run_a to run_b, and the functions that moved most"""
+    a, b = load_summary(run_a), load_summary(run_b)
+    print(f"{'stage':<12} {'seconds A':>10} {'seconds B':>10} {'change':>9} {'peak KiB A':>11} {'peak KiB B':>11}")
+    for name in list(a['stages']) + [n for n in b['stages'] if n not in a['stages']]:
+        sa, sb = a['stages'].get(name), b['stages'].get(name)
+        secs_a = sa['seconds'] if sa else 0.0
+        secs_b = sb['seconds'] if sb else 0.0
+        change = f'{(secs_b - secs_a) / secs_a:+.0%}' if secs_a else 'new'
+        print(f"{name:<12} {secs_a:>10.3f} {secs_b:>10.3f} {change:>9} "
+              f"{(sa['peak_bytes'] if sa else 0) / 1024:>11.1f} {(sb['peak_bytes'] if sb else 0) / 1024:>11.1f}")
+    print(f"{'total':<12} {a['total_seconds']:>10.3f} {b['total_seconds']:>10.3f}")
+
+    for name in b['stages']:
+        times_a = _function_times(os.path.join(run_a, f'{name}.pstats'))
+        times_b = _function_times(os.path.join(run_b, f'{name}.pstats'))
+        deltas = sorted(
+            ((times_b.get(f, 0.0) - times_a.get(f, 0.0), f) for f in set(times_a) | set(times_b)),
+            key=lambda x: -abs(x[0])
+        )[:top]
+        if deltas:
+            print(f"\n[{name}] own-time change by function")
+            for delta, function in deltas:
+                print(f"  {delta * 1e3:>+10.2f} ms  {function}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show a profiled run, or compare two')
+    parser.add_argument('runs', nargs='+', help='one run directory to show, or two to compare')
+    parser.add_argument('--top', type=int, default=10, help='functions listed per stage when comparing')
+    args = parser.parse_args()
+    if len(args.runs) == 1:
+        print_summary(load_summary(args.runs[0]))
+    else:
+        diff_runs(args.runs[0], args.runs[1], args.top)
+
+
+if __name__ == "__main__":
+    main()
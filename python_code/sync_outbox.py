@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Change-data-capture outbox for the local lotto_data table.
+
+SQLite triggers record every insert, update and delete of a draw in `sync_outbox`, so the
+Supabase sync only has to read the outbox instead of rediscovering what changed. Entries are
+read in id order and removed only once the caller acknowledges the batch after a successful
+upload; an interrupted sync simply sees the same entries again, and the upload is an upsert
+keyed on date, so replaying a batch is harmless. Installing the triggers also queues the rows
+Supabase does not have yet, so the first sync is an ordinary drain and a declined or failed
+first sync leaves them pending instead of losing them.
+"""
+
+import os
+import sqlite3
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'Lotto_Results_Database(3).db')
+
+# Columns whose changes need to reach Supabase (uniqueId/last_updated/date_created are local bookkeeping)
+SYNCED_COLUMNS = ['DrawDate', 'DrawNum', 'Numbers', 'Power_Ball', 'Multiplier', 'Jackpot', 'Wins']
+
+OUTBOX_STATEMENTS = [
+    """CREATE TABLE IF NOT EXISTS sync_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        DrawDate DATE NOT NULL,
+        op TEXT NOT NULL CHECK (op IN ('U', 'D')),
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS lotto_data_outbox_insert
+    AFTER INSERT ON lotto_data
+    BEGIN
+        INSERT INTO sync_outbox (DrawDate, op) VALUES (NEW.DrawDate, 'U');
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS lotto_data_outbox_update
+    AFTER UPDATE OF {', '.join(SYNCED_COLUMNS)} ON lotto_data
+    BEGIN
+        INSERT INTO sync_outbox (DrawDate, op)
+            SELECT OLD.DrawDate, 'D' WHERE OLD.DrawDate <> NEW.DrawDate;
+        INSERT INTO sync_outbox (DrawDate, op) VALUES (NEW.DrawDate, 'U');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS lotto_data_outbox_delete
+    AFTER DELETE ON lotto_data
+    BEGIN
+        INSERT INTO sync_outbox (DrawDate, op) VALUES (OLD.DrawDate, 'D');
+    END""",
+]
+
+# Triggers created by OUTBOX_STATEMENTS; the outbox counts as installed only when all of them exist
+TRIGGER_NAMES = ['lotto_data_outbox_insert', 'lotto_data_outbox_update', 'lotto_data_outbox_delete']
+
+
+def _installed(conn: sqlite3.Connection) -> bool:
+    placeholders = ', '.join('?' for _ in TRIGGER_NAMES)
+    count = conn.execute(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN ({placeholders})", TRIGGER_NAMES
+    ).fetchone()[0]
+    return count == len(TRIGGER_NAMES)
+
+
+def is_installed(db_path: str = DEFAULT_DB_PATH) -> bool:
+    conn = sqlite3.connect(db_path)
+    try:
+        return _installed(conn)
+    finally:
+        conn.close()
+
+
+def install(db_path: str = DEFAULT_DB_PATH, since: Optional[str] = None) -> int:
+    """
+    Create the outbox table and triggers; lotto_data must already exist. On first install every
+    draw after `since` (Supabase's latest date; all draws when None) is queued as an upsert.
+    Installing again changes nothing. Returns the number of pending entries.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        # IMMEDIATE takes the write lock before the check, so two processes cannot both seed,
+        # and the triggers and seed rows commit together so no change falls between them
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if not _installed(conn):
+                for statement in OUTBOX_STATEMENTS:
+                    conn.execute(statement)
+                seed = "INSERT INTO sync_outbox (DrawDate, op) SELECT DrawDate, 'U' FROM lotto_data"
+                params = ()
+                if since:
+                    seed += " WHERE DrawDate > ?"
+                    params = (date.fromisoformat(since[:10]).isoformat(),)
+                conn.execute(seed + " ORDER BY DrawDate", params)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return conn.execute("SELECT COUNT(*) FROM sync_outbox").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def pending_count(db_path: str = DEFAULT_DB_PATH) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM sync_outbox").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def read_batch(db_path: str = DEFAULT_DB_PATH, limit: int = 500) -> Tuple[int, List[Dict], List[str]]:
+    """
+    Oldest `limit` outbox entries collapsed to their final state.
+    Returns (last entry id, current lotto_data rows to upsert, draw dates to delete);
+    last entry id is 0 when the outbox is empty.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        entries = conn.execute(
+            "SELECT id, DrawDate, op FROM sync_outbox ORDER BY id LIMIT ?", (limit,)
+        ).fetchall()
+        if not entries:
+            return 0, [], []
+
+        final_op = {}
+        for _, draw_date, op in entries:
+            final_op[draw_date] = op
+        upsert_dates = [d for d, op in final_op.items() if op == 'U']
+        delete_dates = [d for d, op in final_op.items() if op == 'D']
+
+        rows = []
+        if upsert_dates:
+            placeholders = ', '.join('?' for _ in upsert_dates)
+            cursor = conn.execute(
+                f"SELECT * FROM lotto_data WHERE DrawDate IN ({placeholders}) ORDER BY DrawDate",
+                upsert_dates
+            )
+            columns = [c[0] for c in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        return entries[-1][0], rows, delete_dates
+    finally:
+        conn.close()
+
+
+def acknowledge(db_path: str, last_id: int) -> int:
+    """Remove every entry up to and including `last_id` once its batch has been uploaded"""
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.execute("DELETE FROM sync_outbox WHERE id <= ?", (last_id,))
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
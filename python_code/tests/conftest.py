@@ -0,0 +1,52 @@
+import os
+import random
+import sqlite3
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+# The pipeline modules import each other as top-level scripts from python_code/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LOTTO_DATA_SQL = (
+    'CREATE TABLE lotto_data ("DrawDate" DATE NOT NULL, "DrawNum" VARCHAR, "Numbers" VARCHAR, '
+    '"Power_Ball" VARCHAR, "Multiplier" VARCHAR, "Jackpot" VARCHAR, "Wins" VARCHAR, "uniqueId" VARCHAR, '
+    'last_updated DATE, date_created DATE, PRIMARY KEY ("DrawDate"))'
+)
+
+
+def draw_rows(n, seed=0, start=date(2020, 1, 1)):
+    """n lotto_data rows on consecutive days, with rollover runs and jackpot resets"""
+    rng = random.Random(seed)
+    rows = []
+    jackpot = 100_000.0
+    for i in range(n):
+        wins = rng.choice(['0', '0', '0', '1', '-1'])
+        balls = sorted(rng.sample(range(1, 21), 5))
+        rows.append((
+            (start + timedelta(days=i)).isoformat(), str(i + 1), '|'.join(map(str, balls)), '1',
+            str(rng.randint(1, 5)), f'{jackpot:.2f}', wins, f'{i:012x}', '2020-01-01', '2020-01-01',
+        ))
+        jackpot = 100_000.0 if wins == '1' else jackpot + rng.uniform(1_000, 20_000)
+    return rows
+
+
+def insert_rows(db_path, rows):
+    conn = sqlite3.connect(db_path)
+    conn.executemany('INSERT INTO lotto_data VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def lotto_db(tmp_path):
+    """Factory for a SQLite database holding the given lotto_data rows"""
+    def make(rows, name='lotto.db'):
+        path = str(tmp_path / name)
+        conn = sqlite3.connect(path)
+        conn.execute(LOTTO_DATA_SQL)
+        conn.close()
+        insert_rows(path, rows)
+        return path
+    return make
@@ -0,0 +1,94 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import columnar_export
+from conftest import draw_rows, insert_rows
+
+
+def _execute(db_path, sql, params=()):
+    conn = sqlite3.connect(db_path)
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def _assert_matches_rebuild(db_path, store, tmp_path):
+    rebuilt = str(tmp_path / 'rebuilt')
+    columnar_export.export(db_path, rebuilt, rebuild=True)
+    assert columnar_export.open_table(store).equals(columnar_export.open_table(rebuilt))
+    assert columnar_export.is_current(db_path, store)
+
+
+@pytest.fixture
+def exported(lotto_db, tmp_path):
+    """60 of 100 draws with a gap in the middle, exported as two parts either side of the gap"""
+    rows = draw_rows(100)
+    db = lotto_db(rows[:30])
+    store = str(tmp_path / 'store')
+    assert columnar_export.export(db, store) == 30
+    insert_rows(db, rows[50:80])
+    assert columnar_export.export(db, store) == 30
+    return db, store, rows
+
+
+def test_unchanged_store_is_current(exported):
+    db, store, _ = exported
+    assert columnar_export.is_current(db, store)
+    assert columnar_export.export(db, store) == 0
+
+
+def test_appended_draws_become_a_new_part(exported, tmp_path):
+    db, store, rows = exported
+    insert_rows(db, rows[80:])
+    assert not columnar_export.is_current(db, store)
+
+    assert columnar_export.export(db, store) == 20
+    assert len(columnar_export._read_manifest(store)['parts']) == 3
+    _assert_matches_rebuild(db, store, tmp_path)
+
+
+def test_backfilled_draws_rewrite_from_the_gap(exported, tmp_path):
+    db, store, rows = exported
+    insert_rows(db, rows[30:50])
+    assert not columnar_export.is_current(db, store)
+
+    # The part before the gap still matches and is kept
+    assert columnar_export.export(db, store) == 50
+    assert columnar_export._read_manifest(store)['parts'][0]['name'] == 'part-00000.arrow'
+    _assert_matches_rebuild(db, store, tmp_path)
+
+
+def test_deleted_draw_is_removed_from_the_store(exported, tmp_path):
+    db, store, rows = exported
+    _execute(db, 'DELETE FROM lotto_data WHERE DrawDate = ?', (rows[60][0],))
+
+    assert columnar_export.export(db, store) == 29
+    assert columnar_export.open_table(store).num_rows == 59
+    _assert_matches_rebuild(db, store, tmp_path)
+
+
+def test_draw_edited_in_place_needs_verify(exported, tmp_path):
+    db, store, rows = exported
+    _execute(db, "UPDATE lotto_data SET Jackpot = '$1.00' WHERE DrawDate = ?", (rows[10][0],))
+
+    # Counts and the last date are unchanged, so the cheap checks cannot see the edit
+    assert columnar_export.is_current(db, store)
+    assert columnar_export.export(db, store) == 0
+
+    assert columnar_export.export(db, store, verify=True) == 60
+    assert columnar_export.open_table(store, ['Jackpot'])['Jackpot'][10].as_py() == 1.0
+    _assert_matches_rebuild(db, store, tmp_path)
+
+
+def test_many_appends_are_compacted(exported, tmp_path, monkeypatch):
+    db, store, rows = exported
+    monkeypatch.setattr(columnar_export, 'MAX_PARTS', 3)
+    for row in rows[80:85]:
+        insert_rows(db, [row])
+        columnar_export.export(db, store)
+
+    assert len(columnar_export._read_manifest(store)['parts']) <= 3
+    _assert_matches_rebuild(db, store, tmp_path)
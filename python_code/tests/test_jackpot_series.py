@@ -0,0 +1,107 @@
+import sqlite3
+
+import pytest
+
+import jackpot_series
+from conftest import draw_rows, insert_rows
+
+
+def _execute(db_path, sql, params=()):
+    conn = sqlite3.connect(db_path)
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def _lotto_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute('SELECT * FROM lotto_data ORDER BY DrawDate').fetchall()
+    finally:
+        conn.close()
+
+
+def _assert_matches_rebuild(db_path, lotto_db):
+    """The incrementally maintained series equals one materialized from scratch"""
+    fresh = lotto_db(_lotto_rows(db_path), name='rebuild.db')
+    jackpot_series.materialize(fresh)
+    incremental = jackpot_series.read_series(db_path)
+    rebuilt = jackpot_series.read_series(fresh)
+    assert [r['date'] for r in incremental] == [r['date'] for r in rebuilt]
+    for got, expected in zip(incremental, rebuilt):
+        assert got == pytest.approx(expected, nan_ok=True)
+
+
+@pytest.fixture
+def history(lotto_db):
+    """120 draws with a gap in the middle, materialized once"""
+    rows = draw_rows(120)
+    db = lotto_db(rows[:60] + rows[80:])
+    assert jackpot_series.materialize(db) == 100
+    return db, rows
+
+
+def test_second_run_without_changes_writes_nothing(history):
+    db, _ = history
+    assert jackpot_series.materialize(db) == 0
+
+
+def test_appended_draws_match_full_rebuild(history, lotto_db):
+    db, _ = history
+    insert_rows(db, draw_rows(130)[120:])
+
+    assert jackpot_series.materialize(db) == 10
+    _assert_matches_rebuild(db, lotto_db)
+
+
+def test_backfilled_month_matches_full_rebuild(history, lotto_db):
+    db, rows = history
+    insert_rows(db, rows[60:80])
+
+    # Everything from the first backfilled draw on is recomputed
+    assert jackpot_series.materialize(db) == 60
+    _assert_matches_rebuild(db, lotto_db)
+
+
+def test_edited_jackpot_and_wins_match_full_rebuild(history, lotto_db):
+    db, rows = history
+    _execute(db, 'UPDATE lotto_data SET Jackpot = ?, Wins = ? WHERE DrawDate = ?', ('$9,999,999.00', '1', rows[30][0]))
+    _execute(db, "UPDATE lotto_data SET Jackpot = '0' WHERE DrawDate = ?", (rows[90][0],))
+
+    assert jackpot_series.materialize(db) == 70
+    _assert_matches_rebuild(db, lotto_db)
+
+
+def test_deleted_draw_matches_full_rebuild(history, lotto_db):
+    db, rows = history
+    _execute(db, 'DELETE FROM lotto_data WHERE DrawDate = ?', (rows[100][0],))
+
+    jackpot_series.materialize(db)
+    assert rows[100][0] not in {r['date'] for r in jackpot_series.read_series(db)}
+    _assert_matches_rebuild(db, lotto_db)
+
+
+def test_streaks_count_consecutive_rollovers(lotto_db):
+    rows = draw_rows(6)
+    wins = ['0', '0', '1', '0', '0', '0']
+    db = lotto_db([row[:6] + (w,) + row[7:] for row, w in zip(rows, wins)])
+    jackpot_series.materialize(db)
+
+    series = jackpot_series.read_series(db)
+    assert [r['streak'] for r in series] == [1, 2, 0, 1, 2, 3]
+    assert [r['max_streak'] for r in series] == [1, 2, 2, 2, 2, 3]
+    assert [r['reset'] for r in series] == [False, False, True, False, False, False]
+
+
+def test_recomputed_rows_are_pending_until_synced(history):
+    db, rows = history
+    assert jackpot_series.pending_count(db) == 100
+
+    jackpot_series.mark_synced(db, [r['date'] for r in jackpot_series.read_series(db)])
+    assert jackpot_series.pending_count(db) == 0
+    assert jackpot_series.read_series(db, pending=True) == []
+
+    _execute(db, 'UPDATE lotto_data SET Jackpot = ? WHERE DrawDate = ?', ('$1.00', rows[110][0]))
+    jackpot_series.materialize(db)
+    assert jackpot_series.pending_count(db) == 10
+    assert [r['date'] for r in jackpot_series.read_series(db, pending=True)] == [r[0] for r in rows[110:]]
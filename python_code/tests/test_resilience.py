@@ -0,0 +1,181 @@
+import random
+import threading
+
+import pytest
+
+import resilience
+from resilience import Backoff, CircuitBreaker, CircuitOpenError, Counters, Deadline, DeadlineExceeded
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace resilience's monotonic clock with one the test advances by hand"""
+    now = [1000.0]
+    monkeypatch.setattr(resilience, 'monotonic', lambda: now[0])
+
+    def advance(seconds):
+        now[0] += seconds
+    return advance
+
+
+def test_deadline_without_limit_never_expires(clock):
+    deadline = Deadline(None)
+    clock(10**6)
+
+    assert deadline.remaining() == float('inf')
+    assert not deadline.expired()
+    assert deadline.timeout(30) == 30
+
+
+def test_deadline_caps_request_timeout_then_expires(clock):
+    deadline = Deadline(60)
+    clock(50)
+
+    assert deadline.timeout(30) == pytest.approx(10)
+    clock(10)
+    assert deadline.expired()
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout(30)
+
+
+def test_backoff_delays_stay_between_floor_and_ceiling():
+    backoff = Backoff(attempts=5, base_delay=2, max_delay=10, min_delay=1, rng=random.Random(0))
+
+    for attempt in range(1, 8):
+        ceiling = min(10, 2 * 2 ** (attempt - 1))
+        for _ in range(200):
+            assert 1 <= backoff.delay(attempt) <= max(ceiling, 1)
+
+
+def test_backoff_refuses_a_retry_that_would_overrun_the_deadline(clock):
+    backoff = Backoff(base_delay=10, max_delay=10, min_delay=10)
+    deadline = Deadline(15)
+
+    assert backoff.delay_within(1, deadline) == 10
+    clock(6)
+    with pytest.raises(DeadlineExceeded):
+        backoff.delay_within(1, deadline)
+
+
+def _open_breaker(threshold=3, reset_timeout=60):
+    breaker = CircuitBreaker('test', failure_threshold=threshold, reset_timeout=reset_timeout)
+    for _ in range(threshold):
+        breaker.check()
+        breaker.record_failure()
+    return breaker
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_half_open_breaker_admits_one_trial_call(clock):
+    breaker = _open_breaker()
+    clock(60)
+
+    assert breaker.state == 'half-open'
+    breaker.check()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_half_open_admits_one_trial_across_threads(clock):
+    breaker = _open_breaker()
+    clock(60)
+    admitted = []
+    barrier = threading.Barrier(8)
+
+    def call():
+        barrier.wait()
+        try:
+            breaker.check()
+            admitted.append(True)
+        except CircuitOpenError:
+            pass
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(admitted) == 1
+
+
+def test_successful_trial_closes_the_breaker(clock):
+    breaker = _open_breaker()
+    clock(60)
+    breaker.check()
+    breaker.record_success()
+
+    assert breaker.state == 'closed'
+    breaker.check()
+    breaker.check()
+
+
+def test_failed_trial_reopens_the_breaker(clock):
+    breaker = _open_breaker()
+    clock(60)
+    breaker.check()
+    breaker.record_failure()
+
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    clock(60)
+    breaker.check()
+
+
+def test_trial_that_never_reports_back_is_given_up(clock):
+    breaker = _open_breaker()
+    clock(60)
+    breaker.check()
+    clock(59)
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    clock(1)
+    breaker.check()
+
+
+def test_counters_count_stops_and_reraise(clock):
+    counters = Counters()
+    breaker = _open_breaker()
+
+    with pytest.raises(CircuitOpenError):
+        with counters.stops():
+            breaker.check()
+    with pytest.raises(DeadlineExceeded):
+        with counters.stops():
+            Deadline(0).timeout(30)
+    with counters.stops():
+        counters.add('requests')
+
+    assert counters == {'circuit_open': 1, 'deadline': 1, 'requests': 1}
+    assert counters.summary() == 'circuit_open=1, deadline=1, requests=1'
+
+
+def test_counters_add_is_thread_safe():
+    counters = Counters()
+
+    def work():
+        for _ in range(10_000):
+            counters.add('requests')
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counters['requests'] == 40_000
+    assert Counters().summary() == 'no requests'
@@ -0,0 +1,179 @@
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from migrate_to_supabase import SupabaseMigrator
+from conftest import draw_rows
+
+
+class FakeResponse:
+    def __init__(self, data=None, status_code=200, headers=None):
+        self.data = data
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = ''
+
+    def json(self):
+        return self.data
+
+
+class FakeSupabase:
+    """Serves lotto_results GET/HEAD requests from a list of records, capping pages at max_rows"""
+
+    def __init__(self, records, max_rows=1000):
+        self.records = sorted(records, key=lambda r: r['date'])
+        self.max_rows = max_rows
+        self.pages = 0
+
+    def _matching(self, condition):
+        selected = self.records
+        for clause in condition.strip('()').split(','):
+            _, op, value = clause.split('.', 2)
+            compare = {'gte': str.__ge__, 'gt': str.__gt__, 'lt': str.__lt__}[op]
+            selected = [r for r in selected if compare(r['date'], value)]
+        return selected
+
+    def request(self, method, url, params=None, **kwargs):
+        if 'order=date.' in url:
+            if not self.records:
+                return FakeResponse([])
+            record = self.records[0] if 'order=date.asc' in url else self.records[-1]
+            return FakeResponse([{'date': record['date']}])
+        selected = self._matching(params['and'])
+        if method == 'HEAD':
+            return FakeResponse(headers={'Content-Range': f'0-{len(selected) - 1}/{len(selected)}'})
+        self.pages += 1
+        return FakeResponse([dict(r) for r in selected[:min(params['limit'], self.max_rows)]])
+
+
+def remote_records(n, seed=0):
+    """lotto_results records as PostgREST returns them"""
+    return [
+        {'date': r[0], 'draw_num': int(r[1]), 'numbers': r[2], 'power_ball': int(r[3]),
+         'multiplier': int(r[4]), 'jackpot': float(r[5]), 'wins': int(r[6])}
+        for r in draw_rows(n, seed=seed)
+    ]
+
+
+@pytest.fixture
+def restore(monkeypatch):
+    """Run restore_to_sqlite against a FakeSupabase serving `records`"""
+    def run(db_path, records, **kwargs):
+        server = FakeSupabase(records, max_rows=kwargs.pop('max_rows', 1000))
+        migrator = SupabaseMigrator('https://example.supabase.co', 'key', run_deadline=None)
+        monkeypatch.setattr(migrator, '_request', server.request)
+        return migrator.restore_to_sqlite(db_path, **kwargs), server
+    return run
+
+
+def _local(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[0]: row for row in conn.execute('SELECT * FROM lotto_data')}
+    finally:
+        conn.close()
+
+
+def test_restore_into_empty_database(tmp_path, restore):
+    db = str(tmp_path / 'lotto.db')
+    records = remote_records(500)
+
+    ok, _ = restore(db, records, partitions=4, page_size=100)
+
+    assert ok
+    local = _local(db)
+    assert len(local) == 500
+    assert local['2020-01-01'][1:7] == ('1', records[0]['numbers'], '1', str(records[0]['multiplier']),
+                                        str(records[0]['jackpot']), str(records[0]['wins']))
+
+
+def test_restore_reads_past_pages_capped_below_page_size(tmp_path, restore):
+    db = str(tmp_path / 'lotto.db')
+
+    ok, server = restore(db, remote_records(500), partitions=2, page_size=1000, max_rows=60)
+
+    assert ok
+    assert len(_local(db)) == 500
+    # Each partition pages until it gets an empty page
+    assert server.pages >= 500 // 60
+
+
+def test_restore_keeps_local_identity_and_extra_draws(lotto_db, restore):
+    records = remote_records(200)
+    local_rows = draw_rows(200, seed=1)
+    extra = [((date(2021, 1, 1) + timedelta(days=i)).isoformat(),) + row[1:] for i, row in enumerate(draw_rows(5))]
+    db = lotto_db(local_rows[:50] + extra)
+
+    ok, _ = restore(db, records, partitions=3, page_size=70)
+
+    assert ok
+    local = _local(db)
+    assert len(local) == 205
+    for row in local_rows[:50]:
+        restored = local[row[0]]
+        # The draw columns come from Supabase; uniqueId and date_created stay as they were
+        assert restored[2] == records[local_rows.index(row)]['numbers']
+        assert restored[7] == row[7]
+        assert restored[9] == row[9]
+    for row in extra:
+        assert local[row[0]] == row
+
+
+def test_restore_keeps_missing_values_null(tmp_path, restore):
+    db = str(tmp_path / 'lotto.db')
+    records = remote_records(30)
+    records[10].update(jackpot=None, multiplier=None, draw_num=None)
+
+    ok, _ = restore(db, records, partitions=2, page_size=10)
+
+    assert ok
+    row = _local(db)[records[10]['date']]
+    assert row[1] is None and row[4] is None and row[5] is None
+
+
+class DroppingSupabase(FakeSupabase):
+    """Counts every record but never serves the one on `dropped`"""
+
+    def __init__(self, records, dropped, **kwargs):
+        super().__init__(records, **kwargs)
+        self.dropped = dropped
+
+    def request(self, method, url, params=None, **kwargs):
+        response = super().request(method, url, params=params, **kwargs)
+        if method == 'GET' and params:
+            response.data = [r for r in response.data if r['date'] != self.dropped]
+        return response
+
+
+def _verify(db_path, records):
+    """verify_restore for `records` downloaded as a single partition"""
+    migrator = SupabaseMigrator('https://example.supabase.co', 'key', run_deadline=None)
+    migrator._request = FakeSupabase(records).request
+    end = (date.fromisoformat(records[-1]['date']) + timedelta(days=1)).isoformat()
+    return migrator.verify_restore(db_path, [(records[0]['date'], end)], [len(records)],
+                                   SupabaseMigrator._record_checksum(records), [r['date'] for r in records])
+
+
+def test_verify_reports_a_local_copy_that_differs(tmp_path, restore):
+    db = str(tmp_path / 'lotto.db')
+    records = remote_records(100)
+    assert restore(db, records, partitions=2, page_size=50)[0]
+    assert _verify(db, records)
+
+    conn = sqlite3.connect(db)
+    conn.execute("UPDATE lotto_data SET Wins = '7' WHERE DrawDate = ?", (records[5]['date'],))
+    conn.commit()
+    conn.close()
+    assert not _verify(db, records)
+
+
+def test_verify_reports_rows_the_download_missed(tmp_path, monkeypatch):
+    db = str(tmp_path / 'lotto.db')
+    records = remote_records(100)
+    server = DroppingSupabase(records, dropped=records[40]['date'])
+    migrator = SupabaseMigrator('https://example.supabase.co', 'key', run_deadline=None)
+    monkeypatch.setattr(migrator, '_request', server.request)
+
+    assert not migrator.restore_to_sqlite(db, partitions=2, page_size=30)
+    assert len(_local(db)) == 99
@@ -0,0 +1,113 @@
+import sqlite3
+from datetime import date
+
+import sync_outbox
+from conftest import draw_rows, insert_rows
+
+
+def _outbox(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT DrawDate, op FROM sync_outbox ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+def _execute(db_path, sql, params=()):
+    conn = sqlite3.connect(db_path)
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def test_first_install_queues_draws_after_since(lotto_db):
+    db = lotto_db(draw_rows(10))
+    assert not sync_outbox.is_installed(db)
+
+    assert sync_outbox.install(db, since='2020-01-07') == 3
+    assert sync_outbox.is_installed(db)
+    assert [d for d, _ in _outbox(db)] == ['2020-01-08', '2020-01-09', '2020-01-10']
+
+
+def test_install_without_since_queues_every_draw(lotto_db):
+    db = lotto_db(draw_rows(10))
+    assert sync_outbox.install(db) == 10
+
+
+def test_second_install_changes_nothing(lotto_db):
+    db = lotto_db(draw_rows(10))
+    sync_outbox.install(db, since='2020-01-07')
+    sync_outbox.acknowledge(db, 10**9)
+
+    assert sync_outbox.install(db) == 0
+    assert sync_outbox.install(db, since='2000-01-01') == 0
+
+
+def test_triggers_record_synced_changes_only(lotto_db):
+    db = lotto_db(draw_rows(5))
+    sync_outbox.install(db, since='2020-01-05')
+
+    insert_rows(db, draw_rows(1, start=date(2020, 2, 1)))
+    _execute(db, "UPDATE lotto_data SET Jackpot = '1.00' WHERE DrawDate = '2020-01-02'")
+    _execute(db, "UPDATE lotto_data SET uniqueId = 'x', last_updated = '2021-01-01' WHERE DrawDate = '2020-01-03'")
+    _execute(db, "UPDATE lotto_data SET DrawDate = '2020-03-01' WHERE DrawDate = '2020-01-04'")
+    _execute(db, "DELETE FROM lotto_data WHERE DrawDate = '2020-01-01'")
+
+    assert _outbox(db) == [
+        ('2020-02-01', 'U'),
+        ('2020-01-02', 'U'),
+        ('2020-01-04', 'D'),
+        ('2020-03-01', 'U'),
+        ('2020-01-01', 'D'),
+    ]
+
+
+def test_read_batch_collapses_entries_to_final_state(lotto_db):
+    db = lotto_db(draw_rows(3))
+    sync_outbox.install(db, since='2020-01-03')
+    _execute(db, "UPDATE lotto_data SET Jackpot = '2.00' WHERE DrawDate = '2020-01-01'")
+    _execute(db, "UPDATE lotto_data SET Jackpot = '3.00' WHERE DrawDate = '2020-01-01'")
+    _execute(db, "UPDATE lotto_data SET Jackpot = '4.00' WHERE DrawDate = '2020-01-02'")
+    _execute(db, "DELETE FROM lotto_data WHERE DrawDate = '2020-01-02'")
+
+    last_id, rows, deletes = sync_outbox.read_batch(db)
+
+    assert last_id == 4
+    assert [(r['DrawDate'], r['Jackpot']) for r in rows] == [('2020-01-01', '3.00')]
+    assert deletes == ['2020-01-02']
+
+
+def test_acknowledge_keeps_entries_written_after_the_batch(lotto_db):
+    db = lotto_db(draw_rows(4))
+    sync_outbox.install(db)
+    last_id, rows, _ = sync_outbox.read_batch(db, limit=3)
+    # A change lands while the batch is being uploaded
+    _execute(db, "UPDATE lotto_data SET Jackpot = '9.00' WHERE DrawDate = '2020-01-01'")
+
+    assert len(rows) == 3
+    assert sync_outbox.acknowledge(db, last_id) == 3
+    assert _outbox(db) == [('2020-01-04', 'U'), ('2020-01-01', 'U')]
+
+
+def test_unacknowledged_batch_is_read_again(lotto_db):
+    db = lotto_db(draw_rows(4))
+    sync_outbox.install(db)
+
+    first = sync_outbox.read_batch(db, limit=2)
+    assert sync_outbox.read_batch(db, limit=2) == first
+    assert sync_outbox.pending_count(db) == 4
+
+
+def test_empty_outbox_reads_nothing(lotto_db):
+    db = lotto_db(draw_rows(2))
+    sync_outbox.install(db, since='2020-01-02')
+
+    assert sync_outbox.read_batch(db) == (0, [], [])
+
+
+def test_missing_trigger_is_not_installed(lotto_db):
+    db = lotto_db(draw_rows(2))
+    sync_outbox.install(db)
+    _execute(db, "DROP TRIGGER lotto_data_outbox_delete")
+
+    assert not sync_outbox.is_installed(db)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Compare Supabase upload payload formats against a local stand-in for the REST endpoint.
+
+The stand-in accepts the same requests SupabaseMigrator.upload_to_supabase sends (JSON rows,
+CSV, or the columnar RPC body, optionally gzipped), decodes them and counts the records.
+An optional bandwidth limit makes each request take as long as its body would on a slow link.
+
+    python upload_benchmark.py --records 50000 --kbps 1000
+"""
+
+import argparse
+import contextlib
+import csv
+import gzip
+import io
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+from migrate_to_supabase import SupabaseMigrator
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'Lotto_Results_Database(3).db')
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # Set by benchmark(): simulated link speed in bytes per second (0 = unlimited)
+    bytes_per_second = 0
+    received = {'records': 0, 'bytes': 0}
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.bytes_per_second:
+            time.sleep(len(body) / self.bytes_per_second)
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+
+        if self.path.startswith('/rest/v1/rpc/'):
+            records = len(json.loads(body)['dates'])
+        elif self.headers.get('Content-Type') == 'text/csv':
+            records = sum(1 for _ in csv.reader(io.StringIO(body.decode('utf-8')))) - 1
+        else:
+            records = len(json.loads(body))
+
+        StandInHandler.received['records'] += records
+        StandInHandler.received['bytes'] += int(self.headers.get('Content-Length', 0))
+        self.send_response(200 if self.path.startswith('/rest/v1/rpc/') else 201)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def load_records(db_path: str, count: int) -> List[Dict[str, Any]]:
+    """Transformed records from the local database, repeated with shifted dates up to `count`"""
+    import sqlite3
+    from datetime import date, timedelta
+    migrator = SupabaseMigrator('http://127.0.0.1', 'benchmark')
+    conn = sqlite3.connect(db_path)
+    cursor = conn.execute("SELECT * FROM lotto_data ORDER BY DrawDate")
+    columns = [c[0] for c in cursor.description]
+    rows = [dict(zip(columns, r)) for r in cursor.fetchall()]
+    conn.close()
+    with contextlib.redirect_stdout(io.StringIO()):
+        base = migrator.transform_data(rows)
+
+    records = []
+    epoch = date(1900, 1, 1)
+    while len(records) < count:
+        for record in base[:count - len(records)]:
+            shifted = dict(record)
+            shifted['date'] = (epoch + timedelta(days=len(records))).isoformat()
+            records.append(shifted)
+    return records
+
+
+def benchmark(records: List[Dict[str, Any]], kbps: float = 0, batch_size: int = 100):
+    StandInHandler.bytes_per_second = kbps * 1000 / 8
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    migrator = SupabaseMigrator(f'http://127.0.0.1:{server.server_address[1]}', 'benchmark')
+
+    print(f"[*] {len(records)} records, link {'unlimited' if not kbps else f'{kbps:g} kbit/s'}")
+    print(f"{'format':<24} {'batches':>8} {'bytes on wire':>15} {'bytes/record':>13} {'records/s':>12}")
+    try:
+        for payload_format in ('json', 'csv', 'columnar'):
+            for compress in (False, True):
+                for auto_tune in (False, True):
+                    StandInHandler.received = {'records': 0, 'bytes': 0}
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        ok = migrator.upload_to_supabase(records, payload_format, compress, batch_size, auto_tune)
+                    stats = migrator.last_upload_stats
+                    label = payload_format + (' + gzip' if compress else '') + (' (auto)' if auto_tune else '')
+                    received = StandInHandler.received['records']
+                    status = '' if ok and received == len(records) else f'  ERROR: {received} received'
+                    print(f"{label:<24} {stats['batches']:>8} {stats['bytes_sent']:>15,} "
+                          f"{stats['bytes_sent'] / len(records):>13.1f} {stats['records_per_second']:>12,.0f}{status}")
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Supabase upload payload formats')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--kbps', type=float, default=0, help='simulated upload bandwidth, 0 for unlimited')
+    parser.add_argument('--batch-size', type=int, default=100, help='starting batch size')
+    args = parser.parse_args()
+    benchmark(load_records(args.db, args.records), args.kbps, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
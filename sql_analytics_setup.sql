@@ -47,6 +47,88 @@ CREATE TABLE IF NOT EXISTS lottery_actions (
 CREATE INDEX IF NOT EXISTS idx_lottery_actions_device_id ON lottery_actions(device_id);
 CREATE INDEX IF NOT EXISTS idx_lottery_actions_timestamp ON lottery_actions(timestamp);
 
+-- Rollups of app_analytics and lottery_actions, maintained by python_code/analytics_rollup.py.
+-- One row per period ('day' or 'week', weeks start on Monday) and dimension:
+--   'all' (value '')  every action and every app open
+--   'action'          one row per action_type
+--   'platform'        app opens per platform
+--   'app_version'     app opens per app version
+-- App opens are the growth of app_analytics.open_count since the previous run, counted on the
+-- device's last_open day
+-- active_devices is a HyperLogLog estimate (about 2% error); devices_hll holds the sketch so
+-- later runs can merge new devices into the same row
+CREATE TABLE IF NOT EXISTS analytics_rollups (
+  period TEXT NOT NULL CHECK (period IN ('day', 'week')),
+  period_start DATE NOT NULL,
+  dimension TEXT NOT NULL,
+  value TEXT NOT NULL DEFAULT '',
+  events BIGINT NOT NULL DEFAULT 0,
+  active_devices INTEGER NOT NULL DEFAULT 0,
+  devices_hll TEXT NOT NULL,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  PRIMARY KEY (period, period_start, dimension, value)
+);
+
+CREATE INDEX IF NOT EXISTS idx_analytics_rollups_dimension ON analytics_rollups(dimension, period, period_start);
+
+-- How far the rollup job has read each raw table
+CREATE TABLE IF NOT EXISTS analytics_rollup_state (
+  source TEXT PRIMARY KEY,
+  last_id BIGINT NOT NULL DEFAULT 0,
+  last_updated_at TIMESTAMP WITH TIME ZONE
+);
+
+-- open_count of each device when the rollup job last read it, so each run counts only new opens
+CREATE TABLE IF NOT EXISTS analytics_rollup_devices (
+  device_id TEXT PRIMARY KEY,
+  open_count INTEGER NOT NULL DEFAULT 0
+);
+
+-- Rollups are readable by signed-in users; only the rollup job (service_role) writes them.
+-- The job's state tables are not exposed to the app at all.
+ALTER TABLE analytics_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE analytics_rollup_state ENABLE ROW LEVEL SECURITY;
+ALTER TABLE analytics_rollup_devices ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow read access to authenticated users" ON analytics_rollups;
+CREATE POLICY "Allow read access to authenticated users"
+ON analytics_rollups
+FOR SELECT
+TO authenticated
+USING (true);
+
+DROP POLICY IF EXISTS "Allow writes for service role only" ON analytics_rollups;
+CREATE POLICY "Allow writes for service role only"
+ON analytics_rollups
+FOR ALL
+TO service_role
+USING (true)
+WITH CHECK (true);
+
+DROP POLICY IF EXISTS "Allow access for service role only" ON analytics_rollup_state;
+CREATE POLICY "Allow access for service role only"
+ON analytics_rollup_state
+FOR ALL
+TO service_role
+USING (true)
+WITH CHECK (true);
+
+DROP POLICY IF EXISTS "Allow access for service role only" ON analytics_rollup_devices;
+CREATE POLICY "Allow access for service role only"
+ON analytics_rollup_devices
+FOR ALL
+TO service_role
+USING (true)
+WITH CHECK (true);
+
+REVOKE ALL ON analytics_rollups, analytics_rollup_state, analytics_rollup_devices FROM anon, authenticated;
+GRANT SELECT ON analytics_rollups TO authenticated;
+GRANT ALL ON analytics_rollups, analytics_rollup_state, analytics_rollup_devices TO service_role;
+
+-- Keyset pagination indexes for the rollup job
+CREATE INDEX IF NOT EXISTS idx_app_analytics_updated_at_id ON app_analytics(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_lottery_actions_created_at ON lottery_actions(created_at);
+
 -- Insert sample data for testing (optional)
 -- INSERT INTO app_analytics (device_id, app_version, platform, open_count) 
 -- VALUES ('test_device_1', '1.0.0', 'web', 5);
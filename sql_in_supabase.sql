@@ -74,3 +74,68 @@ INSERT INTO public.lotto_results (date, draw_num, numbers, power_ball, multiplie
 ('2024-01-08', 998, '09|20|31|42|53', 8, 4, 35000000.00, 0),
 ('2024-01-05', 997, '08|19|30|41|52', 3, 2, 30000000.00, 0)
 ON CONFLICT (date) DO NOTHING;
+
+-- Table: jackpot_series (precomputed by python_code/jackpot_series.py, one row per draw)
+CREATE TABLE IF NOT EXISTS public.jackpot_series (
+    date date PRIMARY KEY,
+    draw_num integer,
+    jackpot numeric(12,2),        -- NULL when the jackpot was not published
+    wins integer,                 -- -1 when not published
+    rollover boolean NOT NULL DEFAULT false,
+    streak integer NOT NULL DEFAULT 0,
+    max_streak integer NOT NULL DEFAULT 0,
+    reset boolean NOT NULL DEFAULT false,
+    growth numeric(12,2),
+    rolling_mean_10 numeric(12,2),
+    rolling_mean_50 numeric(12,2)
+);
+
+ALTER TABLE public.jackpot_series ENABLE ROW LEVEL SECURITY;
+
+-- Dropped first so this file can be run again against an existing table
+DROP POLICY IF EXISTS "Allow read access to everyone" ON public.jackpot_series;
+CREATE POLICY "Allow read access to everyone"
+ON public.jackpot_series
+FOR SELECT
+USING (true);
+
+DROP POLICY IF EXISTS "Allow writes for service role only" ON public.jackpot_series;
+CREATE POLICY "Allow writes for service role only"
+ON public.jackpot_series
+FOR ALL
+TO service_role
+USING (true)
+WITH CHECK (true);
+
+-- Function: bulk_upsert_lotto_results
+-- Columnar upload route for migrate_to_supabase.py (--format columnar): one array per column,
+-- unnested into lotto_results and merged on date.
+CREATE OR REPLACE FUNCTION public.bulk_upsert_lotto_results(
+    dates date[],
+    draw_nums integer[],
+    numbers text[],
+    power_balls integer[],
+    multipliers integer[],
+    jackpots numeric[],
+    wins integer[]
+) RETURNS integer
+LANGUAGE sql
+AS $$
+    WITH upserted AS (
+        INSERT INTO public.lotto_results (date, draw_num, numbers, power_ball, multiplier, jackpot, wins)
+        SELECT * FROM unnest(dates, draw_nums, numbers, power_balls, multipliers, jackpots, wins)
+        ON CONFLICT (date) DO UPDATE SET
+            draw_num = EXCLUDED.draw_num,
+            numbers = EXCLUDED.numbers,
+            power_ball = EXCLUDED.power_ball,
+            multiplier = EXCLUDED.multiplier,
+            jackpot = EXCLUDED.jackpot,
+            wins = EXCLUDED.wins,
+            last_updated = now()
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM upserted;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.bulk_upsert_lotto_results FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.bulk_upsert_lotto_results TO service_role;